@@ -0,0 +1,107 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from files.environment_file import Environment
+from files.config_file import SimulationConfig
+from files.ensemble_file import Ensemble
+from files.scenario_file import Trajectory, scenario_rng
+import argparse
+import itertools
+import json
+import csv
+import numpy as np
+
+
+def param_grid(grid, base=None):
+    base = (base if base is not None else SimulationConfig.load()).to_dict()
+    keys = list(grid)
+    return [SimulationConfig.from_dict({**base, **dict(zip(keys, values))}) for values in itertools.product(*(grid[key] for key in keys))]
+
+
+def run_config(config, replicate=0, seed=None, trajectory=None):
+    env = Environment(config, vectorized=True, seed=seed, trajectory=trajectory)
+    extinction = None
+    for j in range(1, config.num_steps + 1):
+        if env.step(j):
+            extinction = j
+            break
+
+    return {
+        "config": config.to_dict(),
+        "replicate": replicate,
+        "seed": env.seed,
+        "spawn_key": list(env.seed_sequence.spawn_key),
+        "extinction_gen": extinction,
+        "final_pop": env.pop_num[-1],
+        "pop_num": env.pop_num,
+        "std_dev_sum": [float(s) for s in env.std_dev_sum],
+    }
+
+
+def run_ensemble_config(config, replicates, seed=None):
+    ensemble = Ensemble(config, replicates, seed).run()
+    return [
+        {"config": config.to_dict(), "seed": ensemble.seed, "spawn_key": list(ensemble.seed_sequence.spawn_key), **row}
+        for row in ensemble.results()
+    ]
+
+
+def run_batch_ensemble(configs, replicates=1, processes=None, threads=False, seed=None):
+    # Wszystkie powtórzenia jednej konfiguracji liczone razem jednym krokiem tablicowym
+    entropy = np.random.SeedSequence(seed).entropy
+    seeds = [np.random.SeedSequence(entropy, spawn_key=(i,)) for i in range(len(configs))]
+    executor = ThreadPoolExecutor if threads else ProcessPoolExecutor
+    with executor(processes) as pool:
+        return [row for rows in pool.map(run_ensemble_config, configs, [replicates] * len(configs), seeds) for row in rows]
+
+
+def run_batch(configs, replicates=1, processes=None, threads=False, seed=None):
+    # Strumień losowy zależy tylko od ziarna głównego i pary (konfiguracja, powtórzenie);
+    # trajektoria optimum jest jedna na konfigurację, wspólna dla wszystkich powtórzeń (tak jak w Ensemble)
+    entropy = np.random.SeedSequence(seed).entropy
+    trajectories = [Trajectory.generate(config, scenario_rng(np.random.SeedSequence(entropy, spawn_key=(i,)))) for i, config in enumerate(configs)]
+    tasks = [
+        (config, r, np.random.SeedSequence(entropy, spawn_key=(i, r)), trajectories[i])
+        for i, config in enumerate(configs) for r in range(replicates)
+    ]
+    executor = ThreadPoolExecutor if threads else ProcessPoolExecutor
+    with executor(processes) as pool:
+        return list(pool.map(run_config, *zip(*tasks)))
+
+
+def save_table(results, path):
+    keys = list(results[0]["config"]) if results else []
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["config_id"] + keys + ["replicate", "seed", "spawn_key", "extinction_gen", "final_pop", "pop_num", "std_dev_sum"])
+        configs = []
+        for row in results:
+            if row["config"] not in configs:
+                configs.append(row["config"])
+            writer.writerow(
+                [configs.index(row["config"])]
+                + [row["config"][key] if isinstance(row["config"][key], (int, float, str)) else json.dumps(row["config"][key]) for key in keys]
+                + [row["replicate"], row["seed"], json.dumps(row["spawn_key"]), row["extinction_gen"], row["final_pop"], json.dumps(row["pop_num"]), json.dumps(row["std_dev_sum"])]
+            )
+
+
+def load_configs(path, base=None):
+    base = base if base is not None else SimulationConfig.load()
+    with open(path) as f:
+        sweep = json.load(f)
+    if isinstance(sweep, list):
+        return [base.replace(**params) for params in sweep]
+    return param_grid(sweep, base)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("sweep", help="plik JSON: lista zestawów parametrów albo słownik list wartości (siatka)")
+    parser.add_argument("--replicates", type=int, default=1)
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--threads", action="store_true", help="wątki w jednym procesie zamiast puli procesów")
+    parser.add_argument("--seed", type=int, default=None, help="ziarno główne (zapisywane w wynikach)")
+    parser.add_argument("--ensemble", action="store_true", help="powtórzenia jednej konfiguracji liczone razem (Ensemble)")
+    parser.add_argument("--out", default="wyniki.csv")
+    args = parser.parse_args()
+
+    runner = run_batch_ensemble if args.ensemble else run_batch
+    save_table(runner(load_configs(args.sweep), args.replicates, args.processes, args.threads, args.seed), args.out)
@@ -0,0 +1,202 @@
+from files.environment_file import Environment
+from files.config_file import SimulationConfig
+import itertools
+import argparse
+import platform
+import tracemalloc
+import json
+import time
+import sys
+import os
+import numpy as np
+
+BASELINE_FILE = "files/benchmark_baseline.json"
+
+
+def measure(run, repeat=3):
+    # Najlepszy czas z kilku powtórzeń, potem osobny przebieg ze śledzeniem pamięci
+    best = min(timed(run) for _ in range(repeat))
+    tracemalloc.start()
+    run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak
+
+
+def timed(run):
+    start = time.perf_counter()
+    run()
+    return time.perf_counter() - start
+
+
+def benchmark_config(base, max_population, num_genes, max_num_children, num_steps):
+    # Odległość losowego genotypu od optimum rośnie jak sqrt(num_genes), więc fitness_coefficient**2 rośnie razem z nią;
+    # bez tego populacje z wieloma genami wymierają w pierwszych pokoleniach i mierzony jest pusty krok
+    fitness_coefficient = base.fitness_coefficient * (num_genes / base.num_genes) ** 0.25
+    return base.replace(
+        init_population=max_population, max_population=max_population, num_genes=num_genes,
+        max_num_children=max_num_children, num_steps=num_steps, fitness_coefficient=fitness_coefficient
+    )
+
+
+def extinct(config, generation):
+    return ValueError(f"Populacja wymarła w pokoleniu {generation} (max_population={config.max_population}, num_genes={config.num_genes}, max_num_children={config.max_num_children}); pomiar byłby bez znaczenia")
+
+
+def warm_environment(config, vectorized, generations=3):
+    env = Environment(config, vectorized, seed=0)
+    for j in range(1, generations + 1):
+        if env.step(j):
+            raise extinct(config, j)
+    return env
+
+
+def bench_step(config, vectorized, generations):
+    # Przepustowość liczona z pokoleń, które rzeczywiście się wykonały, i z faktycznej liczebności
+    counted = {}
+    def run():
+        env = warm_environment(config, vectorized, 1)
+        for j in range(2, generations + 2):
+            if env.step(j):
+                raise extinct(config, j)
+        counted["generations"] = generations
+        counted["individuals"] = sum(env.pop_num[1:-1])
+    seconds, peak = measure(run)
+    return {"gens_per_sec": counted["generations"] / seconds, "individuals_per_sec": counted["individuals"] / seconds, "peak_mb": peak / 2**20}
+
+
+def bench_specimen(config, method):
+    env = warm_environment(config, False)
+    population = env.population
+    def run():
+        for spec in population:
+            getattr(spec, method)()
+    seconds, peak = measure(run)
+    return {"individuals_per_sec": len(population) / seconds, "peak_mb": peak / 2**20}
+
+
+def bench_select_population(config):
+    env = warm_environment(config, False)
+    offspring = sorted(env.population * (config.max_num_children + 1), key=lambda spec: spec.fit, reverse=True)
+    seconds, peak = measure(lambda: env.select_population(offspring, config.max_population))
+    return {"individuals_per_sec": len(offspring) / seconds, "peak_mb": peak / 2**20}
+
+
+def bench_genealogy(config, generations):
+    env = warm_environment(config, True, generations)
+    survivors = list(env.population)
+    founders = range(1, len(env.ancestral_population) + 1)
+    def run():
+        for spec in survivors:
+            env.genealogy.history(spec.generation, spec.parent, spec.fit, spec.rank)
+        for rank in founders:
+            for _ in env.genealogy.descendants(rank):
+                pass
+    seconds, peak = measure(run, repeat=1)
+    return {"individuals_per_sec": (len(survivors) + len(founders)) / seconds, "peak_mb": peak / 2**20}
+
+
+def bench_update_plot(config, frames):
+    from files.population_visualiser import PopulationVisualizer
+
+    env = warm_environment(config, True)
+    vis = PopulationVisualizer(config, offscreen=True)
+
+    def run():
+        for j in range(frames):
+            vis.update_plot(env.population, env.opt_genotype, env.old_genotype, j + 1, False, env.how_big, env.stats)
+    seconds, peak = measure(run, repeat=1)
+    return {"frames_per_sec": frames / seconds, "individuals_per_sec": frames * len(env.population) / seconds, "peak_mb": peak / 2**20}
+
+
+def run_suite(max_populations=(1000, 10000), num_genes=(2, 16), max_num_children=(3, 7), generations=20, render=True):
+    base = SimulationConfig.load()
+    results = []
+    for max_population, genes, children in itertools.product(max_populations, num_genes, max_num_children):
+        config = benchmark_config(base, max_population, genes, children, generations + 3)
+        params = {"max_population": max_population, "num_genes": genes, "max_num_children": children}
+
+        cases = [("step_arrays", lambda: bench_step(config, True, generations))]
+        if max_population <= 1000:
+            cases += [
+                ("step_specimens", lambda: bench_step(config, False, generations)),
+                ("specimen_mutate", lambda: bench_specimen(config, "mutate")),
+                ("specimen_calc_fit", lambda: bench_specimen(config, "calc_fit")),
+                ("select_population", lambda: bench_select_population(config)),
+            ]
+        cases.append(("genealogy_walks", lambda: bench_genealogy(config, generations)))
+        if render:
+            cases.append(("update_plot", lambda: bench_update_plot(config, 5)))
+
+        for name, bench in cases:
+            result = {"name": name, "params": params, **bench()}
+            print(json.dumps(result), file=sys.stderr)
+            results.append(result)
+
+    return {
+        "meta": {
+            "python": platform.python_version(), "numpy": np.__version__, "machine": platform.machine(),
+            "platform": platform.platform(), "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+        },
+        "results": results,
+    }
+
+
+THROUGHPUT = ("individuals_per_sec", "gens_per_sec", "frames_per_sec")
+
+
+def compare(report, baseline, tolerance=0.2, memory_tolerance=0.2, memory_floor=1.0):
+    # Regresja: przepustowość spadła o więcej niż tolerance albo szczyt pamięci wzrósł o więcej niż memory_tolerance;
+    # przyrosty pamięci poniżej memory_floor MB pomijamy, bo przy maleńkich szczytach względna zmiana to szum
+    regressions = []
+    reference = {(row["name"], json.dumps(row["params"], sort_keys=True)): row for row in baseline["results"]}
+    for row in report["results"]:
+        old = reference.get((row["name"], json.dumps(row["params"], sort_keys=True)))
+        if old is None:
+            continue
+        row["changes"] = {}
+        for metric in THROUGHPUT:
+            if metric in row and metric in old:
+                change = row[metric] / old[metric] - 1
+                row["changes"][metric] = change
+                if change < -tolerance:
+                    regressions.append((row, metric, change))
+        if "peak_mb" in row and "peak_mb" in old:
+            change = row["peak_mb"] / old["peak_mb"] - 1 if old["peak_mb"] > 0 else 0.0
+            row["changes"]["peak_mb"] = change
+            if change > memory_tolerance and row["peak_mb"] - old["peak_mb"] > memory_floor:
+                regressions.append((row, "peak_mb", change))
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--max-population", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--num-genes", type=int, nargs="+", default=[2, 16])
+    parser.add_argument("--max-num-children", type=int, nargs="+", default=[3, 7])
+    parser.add_argument("--generations", type=int, default=20)
+    parser.add_argument("--no-render", action="store_true", help="bez pomiaru update_plot (nie wymaga pygame)")
+    parser.add_argument("--out", default="benchmark.json")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="plik z wynikami bazowymi do porównania")
+    parser.add_argument("--save-baseline", action="store_true", help="zapisz wyniki jako nową bazę")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="dopuszczalny spadek przepustowości (0.2 = 20%%)")
+    parser.add_argument("--memory-tolerance", type=float, default=0.2, help="dopuszczalny wzrost szczytu pamięci (0.2 = 20%%)")
+    parser.add_argument("--memory-floor", type=float, default=1.0, help="wzrost szczytu pamięci mniejszy niż tyle MB nie jest regresją")
+    args = parser.parse_args()
+
+    report = run_suite(args.max_population, args.num_genes, args.max_num_children, args.generations, not args.no_render)
+
+    regressions = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance, args.memory_tolerance, args.memory_floor)
+        for row in report["results"]:
+            if "changes" in row:
+                print(f"{row['name']} {row['params']}: " + ", ".join(f"{metric} {change:+.1%}" for metric, change in row["changes"].items()))
+        for row, metric, change in regressions:
+            print(f"Regresja: {row['name']} {row['params']} {metric} {change:+.1%}")
+
+    with open(args.baseline if args.save_baseline else args.out, "w") as f:
+        json.dump(report, f, indent=2)
+
+    sys.exit(1 if regressions else 0)
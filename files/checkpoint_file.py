@@ -0,0 +1,134 @@
+from files.environment_file import Environment
+from files.population_file import Population
+from files.config_file import SimulationConfig
+from files.scenario_file import Trajectory, scenario_rng
+import numpy as np
+import json
+import os
+
+
+def population_arrays(population, prefix):
+    # Populacja obiektowa i tablicowa zapisują się tak samo
+    if isinstance(population, Population):
+        genotypes, fit, rank, generation, parent = population.genotypes, population.fit, population.rank, population.generation, population.parent
+    else:
+        genotypes = np.array([spec.genotype for spec in population], dtype=np.float64)
+        fit = np.array([spec.fit for spec in population], dtype=np.float64)
+        rank = np.array([spec.rank for spec in population], dtype=np.int64)
+        generation = np.array([spec.generation for spec in population], dtype=np.int64)
+        parent = np.array([spec.parent for spec in population], dtype=np.int64)
+
+    return {
+        f"{prefix}_genotypes": genotypes, f"{prefix}_fit": fit, f"{prefix}_rank": rank,
+        f"{prefix}_generation": generation, f"{prefix}_parent": parent,
+    }
+
+
+def restore_population(data, prefix, env, as_arrays, buffer=None):
+    num_genes = env.config.num_genes
+    genotypes = data[f"{prefix}_genotypes"].reshape(-1, num_genes)
+    # Bieżąca populacja wraca do bufora środowiska; pozostałe populacje to trwałe kopie obok bufora (w pliku, gdy genotypy są na dysku)
+    if buffer is not None:
+        genotypes = buffer.load(genotypes)
+    elif as_arrays and env.genotype_buffer is not None:
+        genotypes = env.genotype_buffer.snapshot(genotypes)
+    else:
+        genotypes = genotypes.copy()
+    population = Population(
+        env.config, genotypes, data[f"{prefix}_fit"].copy(),
+        data[f"{prefix}_rank"].copy(), data[f"{prefix}_generation"].copy(), data[f"{prefix}_parent"].copy(), env.executor, jit=env.jit, buffer=buffer
+    )
+    if as_arrays:
+        return population
+
+    specimens = []
+    for spec in population:
+        spec.genotype = spec.genotype.copy()
+        spec.fit = float(spec.fit)
+        spec.environment = env
+        specimens.append(spec)
+    return specimens
+
+
+def save_checkpoint(env, path):
+    genealogy = env.genealogy
+    lengths = np.array([len(level) for level in genealogy.parents], dtype=np.int64)
+    concat = lambda levels, dtype: np.concatenate(levels) if levels else np.zeros(0, dtype=dtype)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez_compressed(
+            f,
+            config=json.dumps(env.config.to_dict()),
+            vectorized=env.vectorized,
+            precision=env.precision,
+            keep_history=env.keep_history,
+            seed=str(env.seed),
+            spawn_key=np.array(env.seed_sequence.spawn_key, dtype=np.int64),
+            rng_state=json.dumps(env.rng.bit_generator.state),
+            opt_genotype=env.opt_genotype,
+            old_genotype=env.old_genotype if env.old_genotype is not None else np.zeros(0),
+            how_big=env.how_big,
+            trajectory_optimum=env.trajectory.optimum,
+            trajectory_how_big=env.trajectory.how_big,
+            gen=np.array(env.gen, dtype=np.int64),
+            pop_num=np.array(env.pop_num, dtype=np.int64),
+            std_dev_sum=np.array(env.std_dev_sum, dtype=np.float64),
+            avg_genotypes=np.array(env.avg_genotypes, dtype=np.float64),
+            most_fitted_genotype=np.array(env.most_fitted_genotype, dtype=np.float64),
+            genealogy_prune=genealogy.prune_extinct,
+            genealogy_record=genealogy.recording,
+            genealogy_lengths=lengths,
+            genealogy_parents=concat(genealogy.parents, np.int32),
+            genealogy_fits=concat(genealogy.fits, np.float64),
+            genealogy_ranks=concat(genealogy.ranks, np.int32),
+            **population_arrays(env.population, "population"),
+            **population_arrays(env.ancestral_population, "ancestral"),
+        )
+    os.replace(tmp_path, path)
+
+
+def load_checkpoint(path, config=None, seed=None, metrics=None, workers=None, jit=False, genotype_file=None):
+    # config/seed pozwalają odgałęzić nowy scenariusz od wspólnego rozgrzewania
+    with np.load(path) as data:
+        saved_config = SimulationConfig.from_dict(json.loads(str(data["config"])))
+        config = config if config is not None else saved_config
+        vectorized = bool(data["vectorized"])
+
+        resume = seed is None
+        if resume:
+            seed = np.random.SeedSequence(int(str(data["seed"])), spawn_key=tuple(int(k) for k in data["spawn_key"]))
+        precision = str(data["precision"]) if "precision" in data else "float64"
+        env = Environment(
+            config, vectorized, bool(data["genealogy_prune"]), seed, metrics, bool(data["keep_history"]), workers=workers, jit=jit,
+            precision=precision, genotype_file=genotype_file, record_genealogy=bool(data["genealogy_record"]) if "genealogy_record" in data else True
+        )
+        if resume:
+            env.rng.bit_generator.state = json.loads(str(data["rng_state"]))
+
+        env.opt_genotype = data["opt_genotype"].copy()
+        env.old_genotype = data["old_genotype"].copy() if len(data["old_genotype"]) else None
+        env.how_big = int(data["how_big"])
+        env.gen = data["gen"].tolist()
+        # Przy wznowieniu ta sama trajektoria optimum; przy nowej konfiguracji lub ziarnie dalsza część liczona od nowa
+        if "trajectory_optimum" in data:
+            trajectory = Trajectory(data["trajectory_optimum"].copy(), data["trajectory_how_big"].copy())
+        else:
+            trajectory = Trajectory(np.repeat(env.opt_genotype[None], env.gen[-1] + 1, axis=0), np.zeros(env.gen[-1] + 1, dtype=np.int64))
+        if not resume or config != saved_config or "trajectory_optimum" not in data:
+            trajectory = trajectory.branch(config, env.gen[-1], scenario_rng(env.seed_sequence))
+        env.trajectory = trajectory
+        env.pop_num = data["pop_num"].tolist()
+        env.std_dev_sum = data["std_dev_sum"].tolist()
+        env.avg_genotypes = [row.tolist() for row in data["avg_genotypes"]]
+        env.most_fitted_genotype = list(data["most_fitted_genotype"].copy())
+
+        offsets = np.cumsum(data["genealogy_lengths"])[:-1]
+        env.genealogy.parents = np.split(data["genealogy_parents"], offsets) if len(data["genealogy_lengths"]) else []
+        env.genealogy.fits = np.split(data["genealogy_fits"], offsets) if len(data["genealogy_lengths"]) else []
+        env.genealogy.ranks = np.split(data["genealogy_ranks"], offsets) if len(data["genealogy_lengths"]) else []
+
+        env.population = restore_population(data, "population", env, vectorized, env.genotype_buffer)
+        env.ancestral_population = restore_population(data, "ancestral", env, vectorized)
+
+    return env
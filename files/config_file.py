@@ -0,0 +1,76 @@
+import json
+
+PARAMS_FILE = "files/fisher_model_params.json"
+
+
+class SimulationConfig:
+    fields = (
+        "init_population", "max_population", "num_genes", "mutation_probability",
+        "mutation_effect", "fitness_coefficient", "max_num_children", "scenario",
+        "global_warming_scale", "global_warming_var", "meteor_impact_strategy",
+        "meteor_impact_every", "meteor_impact_at", "num_steps"
+    )
+
+    def __init__(self, init_population=200, max_population=1000, num_genes=2, mutation_probability=0.75,
+                 mutation_effect=0.3, fitness_coefficient=0.5, max_num_children=7, scenario="global warning",
+                 global_warming_scale=0.007, global_warming_var=0.001, meteor_impact_strategy=0,
+                 meteor_impact_every=20, meteor_impact_at=(20, 40), num_steps=200):
+        self.init_population = init_population
+        self.max_population = max_population
+        self.num_genes = num_genes
+        self.mutation_probability = mutation_probability
+        self.mutation_effect = mutation_effect
+        self.fitness_coefficient = fitness_coefficient
+        self.max_num_children = max_num_children
+        self.scenario = scenario
+        self.global_warming_scale = global_warming_scale
+        self.global_warming_var = global_warming_var
+        self.meteor_impact_strategy = meteor_impact_strategy
+        self.meteor_impact_every = meteor_impact_every
+        self.meteor_impact_at = list(meteor_impact_at)
+        self.num_steps = num_steps
+        self.validate()
+
+    @classmethod
+    def from_dict(cls, params):
+        unknown = set(params) - set(cls.fields)
+        if unknown:
+            raise ValueError(f"Nieznane parametry: {sorted(unknown)}")
+        return cls(**params)
+
+    @classmethod
+    def load(cls, path=PARAMS_FILE):
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+    def to_dict(self):
+        return {key: getattr(self, key) for key in self.fields}
+
+    def replace(self, **changes):
+        return self.from_dict({**self.to_dict(), **changes})
+
+    def __eq__(self, other):
+        return isinstance(other, SimulationConfig) and self.to_dict() == other.to_dict()
+
+    def __repr__(self):
+        return f"SimulationConfig({self.to_dict()})"
+
+    def validate(self):
+        for key in ("init_population", "max_population", "num_genes", "meteor_impact_every"):
+            if not isinstance(getattr(self, key), int) or getattr(self, key) <= 0:
+                raise ValueError(f"{key} musi być dodatnią liczbą całkowitą")
+        for key in ("max_num_children", "num_steps"):
+            if not isinstance(getattr(self, key), int) or getattr(self, key) < 0:
+                raise ValueError(f"{key} musi być nieujemną liczbą całkowitą")
+        if not 0 <= self.mutation_probability <= 1:
+            raise ValueError("mutation_probability musi być z przedziału [0, 1]")
+        if self.global_warming_var < 0:
+            raise ValueError("global_warming_var nie może być ujemny")
+        if self.mutation_effect < 0:
+            raise ValueError("mutation_effect nie może być ujemny")
+        if self.fitness_coefficient <= 0:
+            raise ValueError("fitness_coefficient musi być dodatni")
+        if len(self.meteor_impact_at) != 2 or not self.meteor_impact_at[0] < self.meteor_impact_at[1]:
+            raise ValueError("meteor_impact_at musi być parą [min, max] z min < max")
+        if isinstance(self.global_warming_scale, list) and len(self.global_warming_scale) != self.num_genes:
+            raise ValueError("global_warming_scale jako lista musi mieć num_genes elementów")
@@ -0,0 +1,119 @@
+from files.config_file import SimulationConfig
+from files.scenario_file import Trajectory, scenario_rng
+import numpy as np
+
+
+class Ensemble:
+    # R niezależnych powtórzeń modelu w jednej tablicy R×N×num_genes; wymarłe powtórzenia są maskowane,
+    # a wszystkie powtórzenia żyją w tym samym środowisku (wspólna trajektoria optimum)
+    def __init__(self, config=None, replicates=10, seed=None, trajectory=None):
+        self.config = config if config is not None else SimulationConfig.load()
+        config = self.config
+        self.replicates = replicates
+        self.seed_sequence = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+        self.seed = self.seed_sequence.entropy
+        self.rng = np.random.default_rng(self.seed_sequence)
+
+        self.capacity = max(config.init_population, config.max_population)
+        self.genotypes = np.zeros((replicates, self.capacity, config.num_genes))
+        self.genotypes[:, :config.init_population] = self.rng.uniform(0, 1, (replicates, config.init_population, config.num_genes))
+        self.size = np.full(replicates, config.init_population, dtype=np.int64)
+        self.fit = np.zeros((replicates, self.capacity))
+        self.trajectory = trajectory if trajectory is not None else Trajectory.generate(config, scenario_rng(self.seed_sequence))
+        self.opt_genotype = self.trajectory.optimum[0].copy()
+        self.old_genotype = None
+        self.how_big = 0
+
+        self.extinct = np.zeros(replicates, dtype=bool)
+        self.extinction_gen = np.full(replicates, -1, dtype=np.int64)
+        self.gen = [0]
+        self.pop_num = [self.size.copy()]
+        self.std_dev_sum = []
+
+    def valid(self):
+        return np.arange(self.capacity) < self.size[:, None]
+
+    def step(self, nr):
+        config = self.config
+        replicates, capacity, genes = self.genotypes.shape
+        active = ~self.extinct
+
+        self.gen.append(nr)
+        self.old_genotype = self.trajectory.optimum[nr - 1].copy()
+        self.opt_genotype = self.trajectory.optimum[nr].copy()
+        self.how_big = int(self.trajectory.how_big[nr])
+
+        valid = self.valid() & active[:, None]
+
+        index = self.rng.integers(genes, size=(replicates, capacity))
+        x = self.rng.uniform(0, 1, (replicates, capacity))
+        threshold = np.where(index < int(genes/2), config.mutation_probability, config.mutation_probability/10)
+        r, i = np.nonzero(valid & (x < threshold))
+        self.genotypes[r, i, index[r, i]] += self.rng.normal(0, config.mutation_effect, len(r))
+
+        dist = np.sqrt(np.sum((self.genotypes - self.opt_genotype)**2, axis=2))
+        self.fit = np.where(valid, np.exp(-dist/(2*config.fitness_coefficient**2)), -1.0)
+
+        size = np.maximum(self.size, 1)[:, None]
+        mean = np.where(valid[:, :, None], self.genotypes, 0).sum(axis=1) / size
+        variance = np.where(valid[:, :, None], (self.genotypes - mean[:, None, :])**2, 0).sum(axis=1) / size
+        std_dev_sum = np.round(np.sqrt(variance), 3).sum(axis=1)
+        self.std_dev_sum.append(np.where(active, std_dev_sum, np.nan))
+
+        order = np.argsort(-self.fit, axis=1, kind="stable")
+        self.genotypes = np.take_along_axis(self.genotypes, order[:, :, None], axis=1)
+        self.fit = np.take_along_axis(self.fit, order, axis=1)
+
+        # Każdy rodzic ma max_num_children+1 miejsc na potomków; puste miejsca dostają klucz inf
+        slots = config.max_num_children + 1
+        counts = np.where(valid, np.floor(np.maximum(self.fit, 0) * slots), 0).astype(np.int64)
+        offspring = counts.sum(axis=1)
+        child = np.arange(slots)
+        position = (np.cumsum(counts, axis=1) - counts)[:, :, None] + child
+        weights = 1 - position * (1 - 0.0001) / np.maximum(offspring - 1, 1)[:, None, None]
+        born = child < counts[:, :, None]
+        keys = np.full(weights.shape, np.inf)
+        keys[born] = self.rng.standard_exponential(int(offspring.sum())) / weights[born]
+        keys = keys.reshape(replicates, capacity * slots)
+
+        kept = min(config.max_population, capacity * slots)
+        chosen = np.argpartition(keys, kept - 1, axis=1)[:, :kept]
+        chosen_ok = np.isfinite(np.take_along_axis(keys, chosen, axis=1))
+        chosen = np.sort(np.where(chosen_ok, chosen, capacity * slots), axis=1)
+        new_size = chosen_ok.sum(axis=1)
+
+        survivors = np.arange(kept) < new_size[:, None]
+        parent_rows = np.where(survivors, chosen // slots, 0)
+        children = np.zeros_like(self.genotypes)
+        children[:, :kept] = np.take_along_axis(self.genotypes, parent_rows[:, :, None], axis=1) * survivors[:, :, None]
+        self.genotypes = children
+
+        died = active & (offspring == 0)
+        self.extinct |= died
+        self.extinction_gen[died] = nr
+        self.size = np.where(self.extinct, 0, new_size)
+        self.pop_num.append(self.size.copy())
+
+        return bool(self.extinct.all())
+
+    def run(self, num_steps=None):
+        num_steps = num_steps if num_steps is not None else self.config.num_steps
+        for j in range(self.gen[-1] + 1, num_steps + 1):
+            if self.step(j):
+                break
+        return self
+
+    def results(self):
+        pop_num = np.array(self.pop_num)
+        std_dev_sum = np.array(self.std_dev_sum)
+        rows = []
+        for r in range(self.replicates):
+            end = self.extinction_gen[r] if self.extinct[r] else len(self.gen) - 1
+            rows.append({
+                "replicate": r,
+                "extinction_gen": int(self.extinction_gen[r]) if self.extinct[r] else None,
+                "final_pop": int(pop_num[end, r]),
+                "pop_num": pop_num[:end + 1, r].tolist(),
+                "std_dev_sum": std_dev_sum[:end, r].tolist(),
+            })
+        return rows
@@ -1,91 +1,148 @@
 from files.specimen_file import Specimen
-import math
+from files.population_file import Population, GenotypeBuffer
+from files.genealogy_file import Genealogy
+from files.config_file import SimulationConfig
+from files.statistics_file import GenerationStats
+from files.kernels_file import HAVE_JIT
+from files.scenario_file import Trajectory, scenario_rng
+from concurrent.futures import ThreadPoolExecutor
+import warnings
 import numpy as np
-import json
 import copy
 
 
-with open("files/fisher_model_params.json") as f:
-    try:
-        [
-            init_population, max_population, num_genes, mutation_probability,
-            mutation_effect, fitness_coefficient, max_num_children, scenario,
-            global_warming_scale, global_warming_var, meteor_impact_strategy,
-            meteor_impact_every, meteor_impact_at, num_steps
-        ] = json.load(f).values()
-
-    except Exception as e:
-        print(e)
-
 class Environment:
-    def __init__(self):
-        self.population = [Specimen(np.random.uniform(0, 1, num_genes), self, 0) for _ in range(init_population)]
-        self.max_pop_num = max_population
+    def __init__(self, config=None, vectorized=False, prune_genealogy=False, seed=None, metrics=None, keep_history=True, stats_quantiles=None, workers=None, jit=False, profiler=None, trajectory=None, precision="float64", genotype_file=None, record_genealogy=True):
+        self.config = config if config is not None else SimulationConfig.load()
+        config = self.config
+        self.seed_sequence = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+        self.seed = self.seed_sequence.entropy
+        self.rng = np.random.default_rng(self.seed_sequence)
+        self.vectorized = vectorized
+        self.executor = ThreadPoolExecutor(workers) if vectorized and workers is not None and workers > 1 else None
+        if not vectorized and (precision != "float64" or genotype_file is not None):
+            raise ValueError("Inna precyzja genotypów i genotypy w pliku wymagają silnika tablicowego (vectorized=True)")
+        if jit and not HAVE_JIT:
+            warnings.warn("Numba nie jest zainstalowana, liczę w czystym NumPy")
+        if jit and HAVE_JIT and precision == "float16":
+            warnings.warn("Numba nie obsługuje float16, liczę w czystym NumPy")
+        self.jit = vectorized and jit and HAVE_JIT and precision != "float16"
+        self.precision = precision
+        self.genotype_file = genotype_file
+        self.genealogy = Genealogy(prune_genealogy, record_genealogy)
+        if vectorized:
+            # Genotypy kolejnych pokoleń w dwóch buforach na zmianę; env.population jest ważna do następnego kroku
+            self.genotype_buffer = GenotypeBuffer(max(config.init_population, config.max_population), config.num_genes, precision, genotype_file)
+            self.population = Population.random(config, config.init_population, self.rng, self.executor, self.jit, self.genotype_buffer)
+        else:
+            self.genotype_buffer = None
+            self.population = [Specimen(self.rng.uniform(0, 1, config.num_genes), self, 0) for _ in range(config.init_population)]
+        self.max_pop_num = config.max_population
         self.ancestral_population = []
-        self.opt_genotype = np.random.uniform(0, 1, num_genes)
-        self.mutation_effect = mutation_effect
-        self.mutation_probability = mutation_probability
+        # Cała trajektoria optimum liczona z góry; powtórzenia mogą dzielić jedną trajektorię
+        self.trajectory = trajectory if trajectory is not None else Trajectory.generate(config, scenario_rng(self.seed_sequence))
+        self.opt_genotype = self.trajectory.optimum[0].copy()
+        self.mutation_effect = config.mutation_effect
+        self.mutation_probability = config.mutation_probability
         self.old_genotype = None
-        self.pop_num = [init_population]
+        self.pop_num = [config.init_population]
         self.gen = [0]
         self.most_fitted_genotype = []
         self.std_dev_sum = []
         self.avg_genotypes = []
         self.how_big = 0
+        self.metrics = metrics
+        self.keep_history = keep_history
+        self.stats_quantiles = stats_quantiles
+        self.stats = None
+        self.profiler = profiler
     
+    def mark(self, phase):
+        if self.profiler is not None:
+            self.profiler.mark(phase)
+
     def step(self, nr):
+        if self.profiler is not None:
+            self.profiler.start(nr)
 
+        if nr >= len(self.trajectory):
+            raise ValueError(f"Pokolenie {nr} wykracza poza trajektorię optimum ({len(self.trajectory) - 1} kroków)")
         self.gen.append(nr)
-        self.old_genotype = copy.copy(self.opt_genotype)
-
+        self.old_genotype = self.trajectory.optimum[nr - 1].copy()
+        self.opt_genotype = self.trajectory.optimum[nr].copy()
+        self.how_big = int(self.trajectory.how_big[nr])
+        self.mark("optimum")
+                                           
 
-        if nr%meteor_impact_every==0:
-            sgn = np.random.choice([1, -1])
-            self.how_big = np.random.randint(meteor_impact_at[0], meteor_impact_at[1])
-            self.opt_genotype += sgn * global_warming_scale * self.how_big * 1.5
+        if self.vectorized:
+            is_dead = self.evolve_arrays(nr)
         else:
-            self.opt_genotype += np.array(global_warming_scale)
-                                           
+            is_dead = self.evolve_specimens(nr)
+
+        self.end_generation()
+        return is_dead
 
+    def end_generation(self):
+        if self.metrics is not None:
+            self.metrics.write(self.gen[-1], self.pop_num[-1], self.stats.std_dev_sum, self.stats.mean, self.stats.best_genotype, self.how_big)
+            self.mark("metrics")
+
+        if not self.keep_history:
+            for history in (self.gen, self.pop_num, self.std_dev_sum, self.avg_genotypes, self.most_fitted_genotype):
+                del history[:-1]
+
+    def evolve_specimens(self, nr):
+        config = self.config
         for spec in self.population:
             spec.mutate() 
+        self.mark("mutation")
+
+        for spec in self.population:
             spec.calc_fit()
+        self.mark("fitness")
         
-        self.std_dev_sum.append(sum([round(np.std([ind.genotype[i] for ind in self.population]), 3) for i in range(num_genes)]))
+        self.stats = GenerationStats(np.array([spec.genotype for spec in self.population]), np.array([spec.fit for spec in self.population]), self.stats_quantiles)
+        self.std_dev_sum.append(self.stats.std_dev_sum)
+        self.most_fitted_genotype.append(self.stats.best_genotype)
+        self.avg_genotypes.append(self.stats.avg_genotype)
+        self.mark("statistics")
 
         rank_population = sorted(self.population, key=lambda spec: spec.fit, reverse=True)
 
-        self.most_fitted_genotype.append(rank_population[0].genotype)
-
-        avg_genotype = [0] * num_genes
-
-        for i in range(num_genes):
-            for spec in self.population:
-                avg_genotype[i] += spec.genotype[i]/len(self.population)
-
-        self.avg_genotypes.append(avg_genotype)
-
         for i in range(len(rank_population)):
             rank_population[i].generation = nr
             rank_population[i].rank = i+1
+        self.mark("ranking")
+
+        self.genealogy.record([spec.parent for spec in rank_population], [spec.fit for spec in rank_population])
+        self.mark("genealogy")
 
         if nr == 1:
             self.ancestral_population = copy.copy(rank_population)
+            self.mark("ancestors")
         
-        new_population = []
-
-        for spec in self.population:
-       
-            i = 0
-            for _ in range(math.floor(spec.fit * (max_num_children +1))):
-                i+=1
-                baby = Specimen(spec.genotype.copy(), copy.copy(self), spec.fit)
-                spec.kids.append(baby)
-                baby.parent = spec
-                new_population.append(baby)
-
-        if len(new_population) > 0:
-            self.population = self.select_population(sorted(new_population, key=lambda spec: spec.fit, reverse=True), max_population)
+        fits = np.array([spec.fit for spec in rank_population])
+        parents = np.repeat(np.arange(len(rank_population)), np.floor(fits * (config.max_num_children + 1)).astype(np.int64))
+        self.mark("offspring_counts")
+
+        if len(parents) > 0:
+            chosen = self.select_indices(len(parents), config.max_population)
+            self.mark("selection")
+
+            self.population = []
+            for i in chosen:
+                spec = rank_population[parents[i]]
+                baby = Specimen(spec.genotype.copy(), self, spec.fit)
+                baby.parent = spec.rank - 1
+                baby.generation = nr + 1
+                self.population.append(baby)
+            self.mark("reproduction")
+
+            if self.genealogy.prune_extinct:
+                parents = self.genealogy.prune([spec.parent for spec in self.population])
+                for spec, parent in zip(self.population, parents):
+                    spec.parent = int(parent)
+                self.mark("genealogy")
             self.pop_num.append(len(self.population))
             return False
         
@@ -93,17 +150,76 @@ class Environment:
             self.pop_num.append(0)
             return True 
        
+    def evolve_arrays(self, nr):
+        if self.population.jit:
+            self.population.mutate_and_fit(self.rng, self.opt_genotype)
+            self.mark("mutation+fitness")
+        else:
+            self.population.mutate(self.rng)
+            self.mark("mutation")
+            self.population.calc_fit(self.opt_genotype)
+            self.mark("fitness")
+
+        self.stats = GenerationStats(self.population.genotypes, self.population.fit, self.stats_quantiles)
+        self.std_dev_sum.append(self.stats.std_dev_sum)
+        self.most_fitted_genotype.append(self.stats.best_genotype)
+        self.avg_genotypes.append(self.stats.avg_genotype)
+        self.mark("statistics")
+
+        self.population.rank_population(nr)
+        self.mark("ranking")
+        self.genealogy.record(self.population.parent, self.population.fit)
+        self.mark("genealogy")
+
+        if nr == 1:
+            self.ancestral_population = self.population.copy()
+            self.mark("ancestors")
+
+        parents = self.population.offspring_parents()
+        self.mark("offspring_counts")
+
+        if len(parents) > 0:
+            chosen = parents[self.select_indices(len(parents), self.config.max_population)]
+            self.mark("selection")
+            self.population = self.population.children(chosen)
+            self.mark("reproduction")
+            if self.genealogy.prune_extinct:
+                self.population.parent = self.genealogy.prune(self.population.parent)
+                self.mark("genealogy")
+            self.pop_num.append(len(self.population))
+            return False
+
+        else:
+            self.pop_num.append(0)
+            return True
+
+    def ancestry(self):
+        # Indeks przodków z bieżącą populacją jako ostatnim poziomem: założyciele, wspólni przodkowie, czasy koalescencji.
+        # Po wymarciu env.population to ostatnie uszeregowane pokolenie, już zapisane w genealogii jako ostatni poziom
+        if self.pop_num[-1] == 0:
+            return self.genealogy.ancestry()
+        parents = self.population.parent if self.vectorized else [spec.parent for spec in self.population]
+        return self.genealogy.ancestry(parents)
+
     def select_population(self, new_population, max_population):
                 
         if not new_population or max_population <= 0:
             return []
     
-        probabilities = np.linspace(1, 0.0001, len(new_population))
-
-        max_population = min(max_population, len(new_population))
-
-        selected_indices = np.random.choice(range(len(new_population)), size=max_population, replace=False, p=probabilities/np.sum(probabilities))
+        selected_indices = self.select_indices(len(new_population), max_population)
 
         selected_population = [new_population[i] for i in selected_indices]
         
-        return selected_population
\ No newline at end of file
+        return selected_population
+
+    def select_indices(self, size, max_population):
+        # Losowanie bez zwracania z wagami liniowymi względem rangi (klucze Efraimidisa-Spirakisa), O(N)
+        max_population = min(max_population, size)
+        if max_population <= 0:
+            return np.arange(0)
+        if max_population == size:
+            return np.arange(size)
+
+        weights = np.linspace(1, 0.0001, size)
+        keys = self.rng.standard_exponential(size) / weights
+        return np.sort(np.argpartition(keys, max_population - 1)[:max_population])
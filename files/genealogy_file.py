@@ -0,0 +1,169 @@
+import numpy as np
+
+
+class Genealogy:
+    # Poziom k to uszeregowana populacja pokolenia k+1; parents[k][i] to indeks rodzica w poziomie k-1
+    def __init__(self, prune=False, record=True):
+        self.prune_extinct = prune
+        # record=False: genealogia wyłączona (długie przebiegi ze statystykami na dysk), pamięć nie rośnie z pokoleniami
+        self.recording = record
+        self.parents = []
+        self.fits = []
+        self.ranks = []
+
+    def __len__(self):
+        return len(self.parents)
+
+    def record(self, parents, fits):
+        if not self.recording:
+            return
+        self.parents.append(np.asarray(parents, dtype=np.int32))
+        self.fits.append(np.asarray(fits, dtype=np.float64))
+        self.ranks.append(np.arange(1, len(fits) + 1, dtype=np.int32))
+
+    def prune(self, parents):
+        parents = np.asarray(parents)
+        if not self.parents:
+            return parents
+        child = parents
+        for level in range(len(self.parents) - 1, -1, -1):
+            keep = np.zeros(len(self.parents[level]), dtype=bool)
+            keep[child] = True
+            if keep.all():
+                break
+
+            index = np.cumsum(keep) - 1
+            if level == len(self.parents) - 1:
+                parents = index[parents]
+            else:
+                self.parents[level + 1] = index[self.parents[level + 1]].astype(np.int32)
+
+            self.parents[level] = self.parents[level][keep]
+            self.fits[level] = self.fits[level][keep]
+            self.ranks[level] = self.ranks[level][keep]
+            child = self.parents[level]
+
+        return parents
+
+    def history(self, generation, parent, fit, rank):
+        fitness_values = [fit]
+        ancestral_ranking = rank
+        level = generation - 2
+        while parent >= 0 and 0 <= level < len(self.parents):
+            fitness_values.append(self.fits[level][parent])
+            ancestral_ranking = int(self.ranks[level][parent])
+            parent = self.parents[level][parent]
+            level -= 1
+
+        return fitness_values, ancestral_ranking
+
+    def descendant_levels(self, ranks=None):
+        # Potomkowie wybranych założycieli (domyślnie wszystkich) poziom po poziomie, bez rekurencji:
+        # (pokolenie, rangi, dostosowania, rangi rodziców lub None, rangi założycieli)
+        if not self.ranks:
+            return
+
+        members = np.arange(len(self.ranks[0])) if ranks is None else np.flatnonzero(np.isin(self.ranks[0], ranks))
+        if len(members) == 0:
+            return
+        founders = self.ranks[0][members]
+        yield 1, self.ranks[0][members], self.fits[0][members], None, founders
+
+        for level in range(1, len(self.parents)):
+            label = np.zeros(len(self.parents[level - 1]), dtype=np.int32)
+            label[members] = founders
+            label = label[self.parents[level]]
+            members = np.flatnonzero(label)
+            if len(members) == 0:
+                return
+
+            founders = label[members]
+            parent_ranks = self.ranks[level - 1][self.parents[level][members]]
+            yield level + 1, self.ranks[level][members], self.fits[level][members], parent_ranks, founders
+
+    def descendants(self, rank):
+        for generation, ranks, fits, parent_ranks, _ in self.descendant_levels([rank]):
+            for i in range(len(ranks)):
+                yield generation, int(ranks[i]), float(fits[i]), None if parent_ranks is None else int(parent_ranks[i])
+
+    def ancestry(self, survivors=None):
+        return AncestryIndex(self, survivors)
+
+
+class AncestryIndex:
+    # Wszystkie osobniki genealogii ponumerowane kolejno (poziom po poziomie); up[j][n] to przodek n o 2^j pokoleń
+    # wcześniej (-1: brak). survivors: indeksy rodziców bieżącej populacji w ostatnim poziomie, dopisywana jako poziom wirtualny
+    def __init__(self, genealogy, survivors=None):
+        parents = list(genealogy.parents) + ([np.asarray(survivors)] if survivors is not None else [])
+        self.ranks = list(genealogy.ranks) + ([np.arange(1, len(survivors) + 1)] if survivors is not None else [])
+        sizes = [len(level) for level in parents]
+        self.offsets = np.concatenate([[0], np.cumsum(sizes)]).astype(np.int64)
+
+        up = np.full(self.offsets[-1], -1, dtype=np.int64)
+        founders = np.zeros(self.offsets[-1], dtype=np.int32)
+        for level in range(len(parents)):
+            start, stop = self.offsets[level], self.offsets[level + 1]
+            if level == 0:
+                founders[start:stop] = self.ranks[0]
+            else:
+                up[start:stop] = self.offsets[level - 1] + parents[level]
+                founders[start:stop] = founders[up[start:stop]]
+        self.founders = founders
+
+        self.up = [up]
+        while (1 << len(self.up)) < len(parents):
+            prev = self.up[-1]
+            self.up.append(np.where(prev >= 0, prev[np.maximum(prev, 0)], -1))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def nodes(self, level, index=None):
+        size = self.offsets[level + 1] - self.offsets[level]
+        return self.offsets[level] + (np.arange(size) if index is None else np.asarray(index))
+
+    def locate(self, node):
+        # Numer osobnika -> (pokolenie, ranga)
+        level = int(np.searchsorted(self.offsets, node, side="right")) - 1
+        return level + 1, int(self.ranks[level][node - self.offsets[level]])
+
+    def founder(self, level, index=None):
+        # Ranga założyciela (jak w ancestral_population), O(1) na osobnika
+        return self.founders[self.nodes(level, index)]
+
+    def mrca(self, level, a, b):
+        # Najbliższy wspólny przodek par (a[i], b[i]) z jednego poziomu; -1 gdy linie nie mają wspólnego przodka
+        a, b = self.nodes(level, a), self.nodes(level, b)
+        for up in reversed(self.up):
+            ua, ub = up[a], up[b]
+            move = ua != ub
+            a, b = np.where(move, ua, a), np.where(move, ub, b)
+        parent_a, parent_b = self.up[0][a], self.up[0][b]
+        return np.where(a == b, a, np.where((parent_a == parent_b) & (parent_a >= 0), parent_a, -1))
+
+    def coalescence_times(self, level=None, index=None):
+        # Macierz liczby pokoleń wstecz do wspólnego przodka dla każdej pary; -1 gdy różni założyciele
+        level = len(self) - 1 if level is None else level
+        index = np.arange(self.offsets[level + 1] - self.offsets[level]) if index is None else np.asarray(index)
+        i, j = np.triu_indices(len(index), 1)
+        ancestor = self.mrca(level, index[i], index[j])
+        ancestor_level = np.searchsorted(self.offsets, ancestor, side="right") - 1
+        times = np.zeros((len(index), len(index)), dtype=np.int64)
+        times[i, j] = np.where(ancestor >= 0, level - ancestor_level, -1)
+        times[j, i] = times[i, j]
+        return times
+
+    def population_mrca(self, level=None, index=None):
+        # Wspólny przodek całej grupy: (pokolenie, ranga, ile pokoleń wstecz) albo None
+        level = len(self) - 1 if level is None else level
+        nodes = np.unique(self.nodes(level, index))
+        for up in reversed(self.up):
+            jumped = np.unique(up[nodes])
+            if len(jumped) > 1 and jumped[0] >= 0:
+                nodes = jumped
+        if len(nodes) > 1:
+            nodes = np.unique(self.up[0][nodes])
+            if len(nodes) > 1 or nodes[0] < 0:
+                return None
+        generation, rank = self.locate(int(nodes[0]))
+        return generation, rank, level + 1 - generation
@@ -0,0 +1,246 @@
+from files.environment_file import Environment
+from files.config_file import SimulationConfig
+from files.scenario_file import Trajectory, scenario_rng
+from multiprocessing import Pipe, Process
+from multiprocessing.shared_memory import SharedMemory
+import argparse
+import csv
+import numpy as np
+
+
+class MigrationBuffer:
+    # Emigranci wszystkich wysp w jednym bloku pamięci współdzielonej: genotypes[i, :counts[i]] to emigranci wyspy i
+    def __init__(self, islands, migrants, num_genes, name=None):
+        self.shape = (islands, migrants, num_genes)
+        size = 8 * (islands * migrants * (num_genes + 1) + islands)
+        self.shm = SharedMemory(name=name, create=name is None, size=max(size, 1))
+        self.genotypes = np.ndarray(self.shape, np.float64, self.shm.buf)
+        self.fit = np.ndarray(self.shape[:2], np.float64, self.shm.buf, self.genotypes.nbytes)
+        self.counts = np.ndarray(islands, np.int64, self.shm.buf, self.genotypes.nbytes + self.fit.nbytes)
+        if name is None:
+            self.counts[:] = 0
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def close(self, unlink=False):
+        # Widoki na bufor muszą zniknąć przed zamknięciem pamięci współdzielonej
+        del self.genotypes, self.fit, self.counts
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+
+class Island:
+    # Jedna subpopulacja: zwykłe Environment w trybie tablicowym plus wymiana osobników przez MigrationBuffer.
+    # Bez genealogii: migracja i tak zrywa linie rodowe, a pamięć wyspy nie rośnie z liczbą pokoleń
+    def __init__(self, index, config, seed, trajectory, buffer, migrants):
+        self.index = index
+        self.env = Environment(config, vectorized=True, seed=seed, keep_history=False, trajectory=trajectory, record_genealogy=False)
+        self.buffer = buffer
+        self.migrants = migrants
+        self.is_dead = False
+
+    def run(self, stop):
+        # Kroki do pokolenia stop włącznie (albo do wymarcia); zwraca statystyki każdego pokolenia
+        env = self.env
+        rows = []
+        for j in range(env.gen[-1] + 1, stop + 1):
+            if self.is_dead:
+                break
+            self.is_dead = env.step(j)
+            stats = env.stats
+            rows.append((j, env.pop_num[-1], stats.size, stats.mean, stats.variance, stats.best_fit, stats.best_genotype))
+        self.emigrate()
+        return rows, self.is_dead
+
+    def emigrate(self):
+        # Po kroku populację tworzą niezmutowane kopie rodziców w kolejności ich rang, a najlepsi rodzice mają
+        # wielu potomków (często też są klonami), więc wysyłamy pierwsze wystąpienia różnych genotypów
+        population = self.env.population
+        rows = np.zeros(0, dtype=np.int64) if self.is_dead else np.sort(np.unique(population.genotypes, axis=0, return_index=True)[1])[:self.migrants]
+        k = len(rows)
+        self.buffer.genotypes[self.index, :k] = population.genotypes[rows]
+        self.buffer.fit[self.index, :k] = population.fit[rows]
+        self.buffer.counts[self.index] = k
+
+    def immigrate(self, source):
+        # Imigranci zastępują najsłabsze wiersze, więc liczebność nie przekracza max_population wyspy
+        population = self.env.population
+        k = min(int(self.buffer.counts[source]), len(population))
+        if self.is_dead or k == 0:
+            return 0
+        population.genotypes[-k:] = self.buffer.genotypes[source, :k]
+        population.fit[-k:] = self.buffer.fit[source, :k]
+        return k
+
+
+def island_worker(conn, index, config, seed, trajectory, buffer_name, shape):
+    buffer = MigrationBuffer(*shape, name=buffer_name)
+    island = Island(index, config, seed, trajectory, buffer, shape[1])
+    try:
+        for command, arg in iter(conn.recv, None):
+            conn.send(getattr(island, command)(arg))
+    except Exception as e:
+        conn.send(e)
+    finally:
+        del island
+        buffer.close()
+        conn.close()
+
+
+class Archipelago:
+    # Model wyspowy: każda wyspa ma własne max_population i krok liczony w osobnym procesie; co migration_every
+    # pokoleń wyspa i dostaje migrants najlepszych osobników wyspy i-1 (pierścień). Wszystkie wyspy żyją
+    # we wspólnym środowisku (jedna trajektoria optimum), a gen/pop_num/std_dev_sum dotyczą całego archipelagu
+    def __init__(self, config=None, populations=(250, 250, 250, 250), migration_every=10, migrants=5, seed=None, processes=True, trajectory=None):
+        self.config = config if config is not None else SimulationConfig.load()
+        config = self.config
+        if migration_every is not None and migration_every < 0:
+            raise ValueError("migration_every musi być nieujemne (0: bez migracji)")
+        if migrants < 0:
+            raise ValueError("migrants musi być nieujemne")
+        self.populations = list(populations)
+        self.migration_every = migration_every or None
+        self.migrants = migrants
+        self.seed_sequence = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+        self.seed = self.seed_sequence.entropy
+        self.trajectory = trajectory if trajectory is not None else Trajectory.generate(config, scenario_rng(self.seed_sequence))
+
+        # Strumień losowy wyspy zależy tylko od ziarna głównego i numeru wyspy, a nie od liczby procesów
+        n = len(self.populations)
+        seeds = [np.random.SeedSequence(self.seed, spawn_key=(*self.seed_sequence.spawn_key, i)) for i in range(n)]
+        configs = [config.replace(max_population=m) for m in self.populations]
+        self.buffer = MigrationBuffer(n, migrants, config.num_genes)
+        self.processes = processes
+        if processes:
+            self.workers = []
+            for i in range(n):
+                conn, child = Pipe()
+                worker = Process(target=island_worker, args=(child, i, configs[i], seeds[i], self.trajectory, self.buffer.name, self.buffer.shape), daemon=True)
+                worker.start()
+                child.close()
+                self.workers.append((worker, conn))
+        else:
+            self.islands = [Island(i, configs[i], seeds[i], self.trajectory, self.buffer, migrants) for i in range(n)]
+
+        self.is_dead = np.zeros(n, dtype=bool)
+        self.extinction_gen = np.full(n, -1, dtype=np.int64)
+        self.gen = [0]
+        self.pop_num = [config.init_population * n]
+        self.island_pop_num = [[config.init_population] * n]
+        self.std_dev_sum = []
+        self.avg_genotypes = []
+        self.most_fitted_genotype = []
+        self.migrations = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def call(self, command, args):
+        # Polecenie dla wszystkich wysp naraz; wyspy w procesach liczą równolegle, a odpowiedzi służą za barierę
+        if not self.processes:
+            return [getattr(island, command)(arg) for island, arg in zip(self.islands, args)]
+        for (_, conn), arg in zip(self.workers, args):
+            conn.send((command, arg))
+        replies = [conn.recv() for _, conn in self.workers]
+        for reply in replies:
+            if isinstance(reply, Exception):
+                raise reply
+        return replies
+
+    def step(self, stop):
+        replies = self.call("run", [stop] * len(self.populations))
+        first = self.gen[-1] + 1
+        generations = max((rows[-1][0] for rows, _ in replies if rows), default=first - 1)
+        n, genes = len(replies), self.config.num_genes
+
+        shape = (generations - first + 1, n)
+        pop_num, size, best_fit = np.zeros(shape, dtype=np.int64), np.zeros(shape), np.full(shape, -np.inf)
+        mean, variance, best = np.zeros(shape + (genes,)), np.zeros(shape + (genes,)), np.zeros(shape + (genes,))
+        for i, (rows, is_dead) in enumerate(replies):
+            for j, island_pop, island_size, island_mean, island_variance, island_fit, island_best in rows:
+                t = j - first
+                pop_num[t, i], size[t, i], best_fit[t, i] = island_pop, island_size, island_fit
+                mean[t, i], variance[t, i], best[t, i] = island_mean, island_variance, island_best
+            if is_dead and not self.is_dead[i]:
+                self.is_dead[i] = True
+                self.extinction_gen[i] = rows[-1][0]
+
+        # Średnia i wariancja całego archipelagu ze statystyk wysp (wariancja wewnątrz wysp plus między wyspami)
+        total = size.sum(axis=1)[:, None]
+        pooled_mean = (size[:, :, None] * mean).sum(axis=1) / total
+        pooled_variance = (size[:, :, None] * (variance + (mean - pooled_mean[:, None, :])**2)).sum(axis=1) / total
+        fittest = np.argmax(best_fit, axis=1)
+        for t in range(len(pop_num)):
+            self.gen.append(first + t)
+            self.pop_num.append(int(pop_num[t].sum()))
+            self.island_pop_num.append(pop_num[t].tolist())
+            self.std_dev_sum.append(sum(round(s, 3) for s in np.sqrt(pooled_variance[t])))
+            self.avg_genotypes.append(pooled_mean[t].tolist())
+            self.most_fitted_genotype.append(best[t, fittest[t]])
+        return bool(self.is_dead.all())
+
+    def migrate(self):
+        n = len(self.populations)
+        moved = self.call("immigrate", [(i - 1) % n for i in range(n)])
+        self.migrations.append((self.gen[-1], moved))
+        return moved
+
+    def run(self, num_steps=None):
+        num_steps = num_steps if num_steps is not None else self.config.num_steps
+        every = self.migration_every or num_steps
+        while self.gen[-1] < num_steps:
+            stop = min((self.gen[-1] // every + 1) * every, num_steps)
+            if self.step(stop):
+                break
+            if self.migration_every and self.migrants and stop < num_steps:
+                self.migrate()
+        return self
+
+    def close(self):
+        if self.processes:
+            for worker, conn in self.workers:
+                try:
+                    conn.send(None)
+                except (BrokenPipeError, OSError):
+                    # Proces wyspy zakończył się już po błędzie
+                    pass
+                worker.join()
+                conn.close()
+            self.workers = []
+        else:
+            self.islands = []
+        if self.buffer is not None:
+            self.buffer.close(unlink=True)
+            self.buffer = None
+
+
+def save_islands(archipelago, path):
+    n = len(archipelago.populations)
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["gen", "pop_num", "std_dev_sum"] + [f"pop_num_{i+1}" for i in range(n)])
+        for t, gen in enumerate(archipelago.gen[1:], 1):
+            writer.writerow([gen, archipelago.pop_num[t], float(archipelago.std_dev_sum[t - 1])] + archipelago.island_pop_num[t])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--params", default="files/fisher_model_params.json", help="plik z parametrami modelu")
+    parser.add_argument("--populations", type=int, nargs="+", default=[250, 250, 250, 250], help="max_population kolejnych wysp")
+    parser.add_argument("--migration-every", type=int, default=10, help="co ile pokoleń migracja (0: bez migracji)")
+    parser.add_argument("--migrants", type=int, default=5, help="liczba najlepszych osobników wysyłanych na sąsiednią wyspę")
+    parser.add_argument("--seed", type=int, default=None, help="ziarno główne")
+    parser.add_argument("--sequential", action="store_true", help="wszystkie wyspy w jednym procesie (wynik ten sam)")
+    parser.add_argument("--out", default="wyspy.csv", help="plik CSV z liczebnością i zmiennością archipelagu i wysp")
+    args = parser.parse_args()
+
+    with Archipelago(SimulationConfig.load(args.params), args.populations, args.migration_every, args.migrants, args.seed, not args.sequential) as archipelago:
+        archipelago.run()
+        save_islands(archipelago, args.out)
+        print(f"Pokolenia: {archipelago.gen[-1]}, liczebność: {archipelago.pop_num[-1]}, wymarłe wyspy: {int(archipelago.is_dead.sum())}/{len(archipelago.populations)}")
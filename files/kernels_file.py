@@ -0,0 +1,63 @@
+import importlib.util
+import threading
+import math
+import numpy as np
+
+# Sam import numby trwa kilkaset milisekund, więc przy starcie tylko sprawdzamy, czy jest zainstalowana;
+# jądra są importowane i kompilowane przy pierwszym wywołaniu evolve_rows
+HAVE_JIT = importlib.util.find_spec("numba") is not None
+KERNELS = {}
+KERNELS_LOCK = threading.Lock()
+
+
+def count_mutations(index, x, half, mutation_probability):
+    count = 0
+    for i in range(len(index)):
+        threshold = mutation_probability if index[i] < half else mutation_probability/10
+        if x[i] < threshold:
+            count += 1
+    return count
+
+
+def evolve_kernel(genotypes, index, x, noise, half, mutation_probability, env_genotype, fit_scale, slots, fit, counts):
+    # Mutacja (połowa genów z mutation_probability, reszta z dziesięć razy mniejszym), dostosowanie i liczba potomków w jednej pętli
+    size, genes = genotypes.shape
+    k = 0
+    for i in range(size):
+        threshold = mutation_probability if index[i] < half else mutation_probability/10
+        if x[i] < threshold:
+            genotypes[i, index[i]] += noise[k]
+            k += 1
+
+        dist = 0.0
+        for j in range(genes):
+            diff = genotypes[i, j] - env_genotype[j]
+            dist += diff * diff
+        fit[i] = math.exp(-math.sqrt(dist)/fit_scale)
+        counts[i] = int(math.floor(fit[i] * slots))
+
+
+def kernels():
+    # Wątki liczące kawałki populacji mogą wejść tu jednocześnie; kompilacja odbywa się raz
+    with KERNELS_LOCK:
+        if not KERNELS:
+            if HAVE_JIT:
+                import numba
+                KERNELS["count_mutations"] = numba.njit(cache=True, nogil=True)(count_mutations)
+                KERNELS["evolve_kernel"] = numba.njit(cache=True, nogil=True)(evolve_kernel)
+            else:
+                KERNELS["count_mutations"], KERNELS["evolve_kernel"] = count_mutations, evolve_kernel
+    return KERNELS["count_mutations"], KERNELS["evolve_kernel"]
+
+
+def evolve_rows(genotypes, fit, counts, config, rng, env_genotype):
+    # Liczby losowe ciągnięte w tej samej kolejności co w Population.mutate, więc strumień jest ten sam
+    count_mutations, evolve_kernel = kernels()
+    size, genes = genotypes.shape
+    index = rng.integers(genes, size=size)
+    x = rng.uniform(0, 1, size)
+    noise = rng.normal(0, config.mutation_effect, count_mutations(index, x, int(genes/2), config.mutation_probability))
+    evolve_kernel(
+        genotypes, index, x, noise, int(genes/2), config.mutation_probability, np.asarray(env_genotype, dtype=genotypes.dtype),
+        2*config.fitness_coefficient**2, config.max_num_children + 1, fit, counts
+    )
@@ -0,0 +1,73 @@
+import numpy as np
+import csv
+import os
+
+
+class MetricsWriter:
+    # Statystyki każdego pokolenia dopisywane do pliku CSV, w pamięci najwyżej buffer_size wierszy
+    def __init__(self, path, num_genes, buffer_size=256, resume_from=None):
+        self.path = path
+        self.buffer_size = buffer_size
+        self.columns = (
+            ["gen", "pop_num", "std_dev_sum"]
+            + [f"avg_gene_{i+1}" for i in range(num_genes)]
+            + [f"best_gene_{i+1}" for i in range(num_genes)]
+            + ["how_big"]
+        )
+        self.rows = []
+
+        if resume_from is not None and os.path.exists(path):
+            self.truncate_after(resume_from)
+            self.file = open(path, "a", newline="")
+            self.writer = csv.writer(self.file)
+        else:
+            self.file = open(path, "w", newline="")
+            self.writer = csv.writer(self.file)
+            self.writer.writerow(self.columns)
+            self.file.flush()
+
+    def truncate_after(self, gen):
+        # Po wznowieniu z punktu kontrolnego wyrzucamy pokolenia policzone po jego zapisie;
+        # plik przepisywany wiersz po wierszu do pliku tymczasowego, bez wczytywania całości
+        tmp_path = f"{self.path}.tmp"
+        with open(self.path, newline="") as src, open(tmp_path, "w", newline="") as dst:
+            reader = csv.reader(src)
+            writer = csv.writer(dst)
+            header = next(reader)
+            if header != self.columns:
+                raise ValueError(f"Plik {self.path} ma inne kolumny niż bieżące statystyki; zapisz je do nowego pliku")
+            writer.writerow(header)
+            for row in reader:
+                if int(row[0]) > gen:
+                    break
+                writer.writerow(row)
+        os.replace(tmp_path, self.path)
+
+    def write(self, gen, pop_num, std_dev_sum, avg_genotype, most_fitted_genotype, how_big=0):
+        # how_big: wielkość meteoru w tym pokoleniu (0: brak), do zaznaczania uderzeń na wykresach
+        self.rows.append([int(gen), int(pop_num), float(std_dev_sum)] + [float(g) for g in avg_genotype] + [float(g) for g in most_fitted_genotype] + [int(how_big)])
+        if len(self.rows) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        self.writer.writerows(self.rows)
+        self.rows = []
+        self.file.flush()
+
+    def close(self):
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_metrics(path):
+    with open(path, newline="") as f:
+        columns = next(csv.reader(f))
+    data = np.loadtxt(path, delimiter=",", skiprows=1, ndmin=2)
+    return {column: data[:, i] for i, column in enumerate(columns)}
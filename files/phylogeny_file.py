@@ -0,0 +1,92 @@
+from files.checkpoint_file import load_checkpoint
+import argparse
+import numpy as np
+
+FORMATS = ("graphml", "edges", "newick")
+
+
+def write_graphml(genealogy, f, ranks=None):
+    # Węzły i krawędzie dopisywane poziom po poziomie; rodzic zawsze jest zapisany przed dzieckiem
+    f.write('<?xml version="1.0" encoding="utf-8"?>\n')
+    f.write('<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n')
+    f.write('  <key id="fit" for="node" attr.name="fit" attr.type="double"/>\n')
+    f.write('  <key id="founder" for="node" attr.name="founder" attr.type="int"/>\n')
+    f.write('  <graph edgedefault="directed">\n')
+    for generation, ranks, fits, parent_ranks, founders in genealogy.descendant_levels(ranks):
+        for i in range(len(ranks)):
+            node = f"{generation}.{ranks[i]}"
+            f.write(f'    <node id="{node}"><data key="fit">{float(fits[i])!r}</data><data key="founder">{founders[i]}</data></node>\n')
+            if parent_ranks is not None:
+                f.write(f'    <edge source="{generation - 1}.{parent_ranks[i]}" target="{node}"/>\n')
+    f.write('  </graph>\n</graphml>\n')
+
+
+def write_edges(genealogy, f, ranks=None):
+    # Jeden wiersz na osobnika: węzeł, rodzic ("-" dla założyciela), dostosowanie, założyciel
+    f.write("node\tparent\tfit\tfounder\n")
+    for generation, ranks, fits, parent_ranks, founders in genealogy.descendant_levels(ranks):
+        for i in range(len(ranks)):
+            parent = "-" if parent_ranks is None else f"{generation - 1}.{parent_ranks[i]}"
+            f.write(f"{generation}.{ranks[i]}\t{parent}\t{float(fits[i])!r}\t{founders[i]}\n")
+
+
+def write_newick(genealogy, f, ranks=None):
+    # Drzewo każdego założyciela jako osobna linia Newick; przejście w głąb z jawnym stosem zamiast rekurencji
+    if not genealogy.ranks:
+        return
+    # children[level][i]: indeksy dzieci osobnika i (poziom level) w poziomie level+1, w postaci CSR
+    children = []
+    for level in range(1, len(genealogy.parents)):
+        order = np.argsort(genealogy.parents[level], kind="stable")
+        bounds = np.searchsorted(genealogy.parents[level][order], np.arange(len(genealogy.parents[level - 1]) + 1))
+        children.append((order, bounds))
+
+    def kids(level, index):
+        if level >= len(children):
+            return ()
+        order, bounds = children[level]
+        return order[bounds[index]:bounds[index + 1]]
+
+    def label(level, index):
+        return f"{level + 1}.{genealogy.ranks[level][index]}[&&NHX:fit={float(genealogy.fits[level][index])!r}]" + (":1" if level > 0 else "")
+
+    founders = np.arange(len(genealogy.ranks[0])) if ranks is None else np.flatnonzero(np.isin(genealogy.ranks[0], ranks))
+    for founder in founders:
+        # Na stosie: (poziom, indeks, dzieci, ile dzieci już zapisano)
+        stack = [(0, int(founder), kids(0, founder), 0)]
+        f.write("(" if len(stack[0][2]) else "")
+        while stack:
+            level, index, kid_list, position = stack.pop()
+            if position < len(kid_list):
+                if position > 0:
+                    f.write(",")
+                stack.append((level, index, kid_list, position + 1))
+                kid = int(kid_list[position])
+                grandkids = kids(level + 1, kid)
+                if len(grandkids):
+                    f.write("(")
+                stack.append((level + 1, kid, grandkids, 0))
+            else:
+                f.write((")" if len(kid_list) else "") + label(level, index))
+        f.write(";\n")
+
+
+def export_phylogeny(genealogy, path, ranks=None, fmt=None):
+    # ranks: rangi założycieli (jak w ancestral_population); None to wszyscy w jednym przebiegu
+    fmt = fmt if fmt is not None else {"nwk": "newick", "newick": "newick", "tsv": "edges", "txt": "edges"}.get(path.rsplit(".", 1)[-1], "graphml")
+    if fmt not in FORMATS:
+        raise ValueError(f"Nieznany format drzewa: {fmt} (dostępne: {', '.join(FORMATS)})")
+    writer = {"graphml": write_graphml, "edges": write_edges, "newick": write_newick}[fmt]
+    with open(path, "w", buffering=2**20) as f:
+        writer(genealogy, f, ranks)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("checkpoint", help="plik ze stanem symulacji (symulacja.py --checkpoint)")
+    parser.add_argument("--founders", type=int, nargs="+", default=None, help="rangi założycieli; domyślnie wszyscy")
+    parser.add_argument("--format", default=None, choices=FORMATS, help="domyślnie według rozszerzenia pliku")
+    parser.add_argument("--out", default="drzewo.graphml")
+    args = parser.parse_args()
+
+    export_phylogeny(load_checkpoint(args.checkpoint).genealogy, args.out, args.founders, args.format)
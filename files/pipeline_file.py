@@ -0,0 +1,82 @@
+import threading
+import queue
+import numpy as np
+
+
+class Snapshot:
+    # Wszystko, czego potrzebuje update_plot do narysowania jednego pokolenia
+    __slots__ = ("generation", "genotypes", "opt_genotype", "old_genotype", "how_big", "is_dead", "stats", "last")
+
+    def __init__(self, env, generation, is_dead, last):
+        population = env.population
+        genotypes = getattr(population, "genotypes", None)
+        if genotypes is None:
+            genotypes = np.array([spec.genotype for spec in population]).reshape(-1, env.config.num_genes)
+        self.generation = generation
+        self.genotypes = genotypes.copy()
+        self.opt_genotype = np.array(env.opt_genotype)
+        self.old_genotype = np.array(env.old_genotype)
+        self.how_big = env.how_big
+        self.is_dead = is_dead
+        self.stats = env.stats
+        self.last = last
+
+
+class SimulationPipeline:
+    # Symulacja liczy się w osobnym wątku i odkłada migawki do ograniczonej kolejki;
+    # gdy rysowanie nie nadąża, najstarsze migawki są pomijane, a symulacja nie czeka
+    def __init__(self, env, num_steps=None, queue_size=4):
+        self.env = env
+        self.num_steps = num_steps if num_steps is not None else env.config.num_steps
+        self.queue = queue.Queue(queue_size)
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.dropped = 0
+        self.error = None
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def join(self):
+        self.thread.join()
+
+    def put(self, item):
+        while True:
+            try:
+                self.queue.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def run(self):
+        try:
+            is_dead = False
+            j = self.env.gen[-1] + 1
+            if j > self.num_steps:
+                self.put(None)
+            while not is_dead and j <= self.num_steps:
+                is_dead = self.env.step(j)
+                self.put(Snapshot(self.env, j, is_dead, is_dead or j == self.num_steps))
+                j += 1
+        except BaseException as error:
+            self.error = error
+            self.put(None)
+
+    def snapshots(self):
+        # Zawsze najnowsza dostępna migawka; ostatnie pokolenie trafia do kolejki jako ostatnie, więc nie ginie
+        while True:
+            snapshot = self.queue.get()
+            while not self.queue.empty():
+                snapshot = self.queue.get_nowait()
+                self.dropped += 1
+            if snapshot is None:
+                if self.error is not None:
+                    raise self.error
+                return
+            yield snapshot
+            if snapshot.last:
+                return
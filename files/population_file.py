@@ -0,0 +1,216 @@
+from files.specimen_file import Specimen
+from files.kernels_file import evolve_rows
+import numpy as np
+
+
+def mutate_rows(genotypes, config, rng):
+    size, genes = genotypes.shape
+    index = rng.integers(genes, size=size)
+    x = rng.uniform(0, 1, size)
+    threshold = np.where(index < int(genes/2), config.mutation_probability, config.mutation_probability/10)
+    mutated = np.flatnonzero(x < threshold)
+    genotypes[mutated, index[mutated]] += rng.normal(0, config.mutation_effect, len(mutated))
+
+
+def fitness_rows(genotypes, env_genotype, fitness_coefficient):
+    dist = np.sqrt(np.sum((genotypes - env_genotype)**2, axis=1))
+    return np.exp(-dist/(2*fitness_coefficient**2))
+
+
+PRECISIONS = ("float64", "float32", "float16")
+
+
+class GenotypeBuffer:
+    # Dwie tablice capacity×num_genes na zmianę: pokolenie czyta z jednej i zapisuje potomków do drugiej,
+    # bez nowych alokacji; z path tablice leżą w pliku na dysku (np.memmap) zamiast w pamięci
+    def __init__(self, capacity, num_genes, dtype="float64", path=None):
+        if str(np.dtype(dtype)) not in PRECISIONS:
+            raise ValueError(f"Nieobsługiwana precyzja genotypów: {dtype} (dostępne: {', '.join(PRECISIONS)})")
+        self.dtype = np.dtype(dtype)
+        self.path = path
+        self.current = 0
+        self.allocate(capacity, num_genes)
+
+    def allocate(self, capacity, num_genes):
+        shape = (2, capacity, num_genes)
+        self.arrays = np.memmap(self.path, self.dtype, "w+", shape=shape) if self.path is not None else np.empty(shape, self.dtype)
+
+    @property
+    def capacity(self):
+        return self.arrays.shape[1]
+
+    def front(self, size):
+        return self.arrays[self.current, :size]
+
+    def swap(self, size):
+        # Zwraca drugi bufor (na nowe pokolenie) i od teraz to on jest bieżący
+        self.current = 1 - self.current
+        return self.arrays[self.current, :size]
+
+    def snapshot(self, genotypes, chunk_size=65536):
+        # Trwała kopia poza dwoma buforami pokoleń (populacja przodków); z path w osobnym pliku obok genotypów
+        shape = (len(genotypes), self.arrays.shape[2])
+        out = np.memmap(f"{self.path}.przodkowie", self.dtype, "w+", shape=shape) if self.path is not None else np.empty(shape, self.dtype)
+        for start in range(0, len(genotypes), chunk_size):
+            out[start:start + chunk_size] = genotypes[start:start + chunk_size]
+        return out
+
+    def load(self, genotypes):
+        if len(genotypes) > self.capacity:
+            self.allocate(len(genotypes), self.arrays.shape[2])
+        out = self.front(len(genotypes))
+        out[:] = genotypes
+        return out
+
+
+class Population:
+    # Cała populacja trzymana w tablicach: wiersz i-ty to i-ty osobnik
+    def __init__(self, config, genotypes, fit=None, rank=None, generation=None, parent=None, executor=None, chunk_size=65536, jit=False, buffer=None):
+        size = len(genotypes)
+        self.config = config
+        self.executor = executor
+        self.chunk_size = chunk_size
+        self.jit = jit
+        self.buffer = buffer
+        self.counts = None
+        self.genotypes = genotypes
+        self.fit = fit if fit is not None else np.zeros(size)
+        self.rank = rank if rank is not None else np.zeros(size, dtype=np.int64)
+        self.generation = generation if generation is not None else np.zeros(size, dtype=np.int64)
+        self.parent = parent if parent is not None else np.full(size, -1, dtype=np.int64)
+
+    @classmethod
+    def random(cls, config, size, rng, executor=None, jit=False, buffer=None, chunk_size=65536):
+        if buffer is None:
+            return cls(config, rng.uniform(0, 1, (size, config.num_genes)), executor=executor, jit=jit, chunk_size=chunk_size)
+        # Losowanie kawałkami prosto do bufora; strumień liczb jest ten sam co przy jednym wywołaniu
+        if size > buffer.capacity:
+            buffer.allocate(size, config.num_genes)
+        genotypes = buffer.front(size)
+        for start in range(0, size, chunk_size):
+            genotypes[start:start + chunk_size] = rng.uniform(0, 1, (min(chunk_size, size - start), config.num_genes))
+        return cls(config, genotypes, executor=executor, jit=jit, chunk_size=chunk_size, buffer=buffer)
+
+    def __len__(self):
+        return len(self.genotypes)
+
+    def __getitem__(self, i):
+        # Pojedynczy osobnik jako Specimen, tylko tam, gdzie potrzebuje go okno końcowe
+        spec = Specimen(self.genotypes[i], None, self.fit[i])
+        spec.rank = int(self.rank[i])
+        spec.generation = int(self.generation[i])
+        spec.parent = int(self.parent[i])
+        return spec
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def parallel(self, size):
+        # Po kawałkach także bez wątków, gdy genotypy są na dysku: tymczasowe tablice nie rosną z populacją
+        return (self.executor is not None or (self.buffer is not None and self.buffer.path is not None)) and size > self.chunk_size
+
+    def map_chunks(self, fn, size, *args):
+        # Wątki dzielą tablice populacji bez kopiowania; NumPy zwalnia GIL w tych operacjach
+        bounds = [(start, min(start + self.chunk_size, size)) for start in range(0, size, self.chunk_size)]
+        run = self.executor.map if self.executor is not None else map
+        list(run(lambda chunk: fn(*chunk[0], *chunk[1:]), zip(bounds, *args)))
+
+    def gather(self, array, index, out=None):
+        if out is None and not self.parallel(len(index)):
+            return array[index]
+        if out is None:
+            out = np.empty((len(index),) + array.shape[1:], dtype=array.dtype)
+        if not self.parallel(len(index)):
+            np.take(array, index, axis=0, out=out)
+            return out
+        def gather_chunk(start, stop):
+            np.take(array, index[start:stop], axis=0, out=out[start:stop])
+        self.map_chunks(gather_chunk, len(index))
+        return out
+
+    def regather(self, index):
+        # Wiersze genotypes[index] trafiają do drugiego bufora zamiast do nowej tablicy
+        if self.buffer is None:
+            return self.gather(self.genotypes, index)
+        return self.gather(self.genotypes, index, self.buffer.swap(len(index)))
+
+    def mutate(self, rng):
+        # Duże populacje losują po kawałkach z osobnych strumieni, więc wynik nie zależy od liczby wątków
+        if len(self) <= self.chunk_size:
+            mutate_rows(self.genotypes, self.config, rng)
+            return
+
+        seeds = rng.integers(2**63, size=-(-len(self) // self.chunk_size))
+        def mutate_chunk(start, stop, seed):
+            mutate_rows(self.genotypes[start:stop], self.config, np.random.default_rng(seed))
+        self.map_chunks(mutate_chunk, len(self), seeds)
+
+    def calc_fit(self, env_genotype):
+        if not self.parallel(len(self)):
+            self.fit = fitness_rows(self.genotypes, env_genotype, self.config.fitness_coefficient)
+            return
+
+        self.fit = np.empty(len(self))
+        def fit_chunk(start, stop):
+            self.fit[start:stop] = fitness_rows(self.genotypes[start:stop], env_genotype, self.config.fitness_coefficient)
+        self.map_chunks(fit_chunk, len(self))
+
+    def mutate_and_fit(self, rng, env_genotype):
+        if not self.jit:
+            self.mutate(rng)
+            self.calc_fit(env_genotype)
+            return
+
+        self.fit = np.empty(len(self))
+        self.counts = np.empty(len(self), dtype=np.int64)
+        if len(self) <= self.chunk_size:
+            evolve_rows(self.genotypes, self.fit, self.counts, self.config, rng, env_genotype)
+            return
+
+        seeds = rng.integers(2**63, size=-(-len(self) // self.chunk_size))
+        def evolve_chunk(start, stop, seed):
+            evolve_rows(self.genotypes[start:stop], self.fit[start:stop], self.counts[start:stop], self.config, np.random.default_rng(seed), env_genotype)
+        self.map_chunks(evolve_chunk, len(self), seeds)
+
+    def rank_population(self, nr):
+        order = np.argsort(-self.fit, kind="stable")
+        self.genotypes = self.regather(order)
+        self.fit = self.fit[order]
+        self.parent = self.parent[order]
+        if self.counts is not None:
+            self.counts = self.counts[order]
+        self.rank = np.arange(1, len(self) + 1)
+        self.generation = np.full(len(self), nr)
+        return order
+
+    def num_children(self):
+        if self.counts is not None:
+            return self.counts
+        return np.floor(self.fit * (self.config.max_num_children + 1)).astype(np.int64)
+
+    def offspring_parents(self):
+        # Indeks rodzica dla każdego potomka; populacja jest uszeregowana, więc potomkowie też
+        return np.repeat(np.arange(len(self)), self.num_children())
+
+    def children(self, parents):
+        return Population(
+            self.config, self.regather(parents), self.fit[parents], generation=self.generation[parents] + 1,
+            parent=parents, executor=self.executor, chunk_size=self.chunk_size, jit=self.jit, buffer=self.buffer
+        )
+
+    def copy(self):
+        # Niezależna kopia tablic (poza buforem pokoleń), np. populacja przodków z pierwszego pokolenia;
+        # genotypy trafiają tam, gdzie bufor trzyma pokolenia (do pliku, gdy genotypy są na dysku)
+        if self.buffer is None:
+            return self.take(np.arange(len(self)))
+        return Population(
+            self.config, self.buffer.snapshot(self.genotypes, self.chunk_size), self.fit.copy(), self.rank.copy(), self.generation.copy(),
+            self.parent.copy(), self.executor, self.chunk_size, self.jit
+        )
+
+    def take(self, indices):
+        return Population(
+            self.config, self.gather(self.genotypes, indices), self.fit[indices], self.rank[indices], self.generation[indices],
+            self.parent[indices], self.executor, self.chunk_size, self.jit
+        )
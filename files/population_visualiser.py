@@ -1,24 +1,23 @@
+import os
 import pygame
 import math
-from sklearn.decomposition import PCA
-from scipy.spatial import distance
-import json
 from matplotlib import pyplot as plt
-import networkx as nx
 import numpy as np
-
-with open("files/fisher_model_params.json") as f:
-        [
-            init_population, max_population, num_genes, mutation_probability,
-            mutation_effect, fitness_coefficient, max_num_children, scenario,
-            global_warming_scale, global_warming_var, meteor_impact_strategy,
-            meteor_impact_every, meteor_impact_at, num_steps
-        ] = json.load(f).values()
+from files.config_file import SimulationConfig
+from files.statistics_file import GenerationStats
+from files.phylogeny_file import export_phylogeny
 
 class PopulationVisualizer:
-    def __init__(self):
-        self.fitness_coefficient = fitness_coefficient
-        self.max_num_children = 7
+    def __init__(self, config=None, profiler=None, offscreen=False):
+        self.config = config if config is not None else SimulationConfig.load()
+        self.profiler = profiler
+        # Bez okna, dźwięku i czekania: klatki rysowane tak szybko, jak się da (np. do pliku)
+        self.offscreen = offscreen
+        if offscreen:
+            os.environ["SDL_VIDEODRIVER"] = "dummy"
+            os.environ["SDL_AUDIODRIVER"] = "dummy"
+        self.fitness_coefficient = self.config.fitness_coefficient
+        self.max_num_children = self.config.max_num_children
         self.population_sizes = []
         self.clock = pygame.time.Clock()
         pygame.init()
@@ -40,161 +39,184 @@ class PopulationVisualizer:
 
         koala_size = 70
         skull_size = 30
-        self.koala_img = pygame.transform.scale(self.koala_img, (koala_size, koala_size))
-        self.sigma_koala = pygame.transform.scale(self.koala_sigma, (koala_size+10, koala_size+10))
-        self.dead_koala = pygame.transform.scale(self.dead_koala_img, (skull_size, skull_size))
-
-        self.pca = PCA(n_components=2)
+        self.koala_img = pygame.transform.scale(self.koala_img, (koala_size, koala_size)).convert_alpha()
+        self.sigma_koala = pygame.transform.scale(self.koala_sigma, (koala_size+10, koala_size+10)).convert_alpha()
+        self.dead_koala = pygame.transform.scale(self.dead_koala_img, (skull_size, skull_size)).convert_alpha()
+
+        self.components = None
+        self.components_age = 0
+        self.pca_refit_every = 10
+        self.pca_sample = 2000
+        self.thin_cell = 4
         self.euclidean_distances = []
+        self.distance_generations = []
 
         self.font = pygame.font.Font("files/fonts/czcionka.ttf", 13)
+        self.build_layers()
         self.play_again_button = pygame.Rect(0, 0, 400, 50)
         self.quit_button = pygame.Rect(0, 0, 400, 50)
         self.chart_button = pygame.Rect(0,0,400, 50)
         self.center_buttons()
 
-        self.explosion = pygame.mixer.Sound("files/sounds/explosion.mp3")
-        self.explosion.set_volume(0.5)
+        self.explosion = None
+        if not offscreen:
+            self.explosion = pygame.mixer.Sound("files/sounds/explosion.mp3")
+            self.explosion.set_volume(0.5)
 
         self.highlight_color = (200, 200, 200)
         self.text_color = (255, 255, 255)
         self.last_fit = 0
 
+    def mark(self, phase):
+        if self.profiler is not None:
+            self.profiler.mark(phase)
+
     def center_buttons(self):
         self.play_again_button.center = (1024 // 2, 1024 // 2 - 50)
         self.quit_button.center = (1024 // 2, 1024 // 2 + 150)
         self.chart_button.center = (1024 // 2, 1024 // 2 + 50)
         
-    def update_plot(self, population, opt_genotype, old_genotype, nr, is_dead, how_big):
-        def depict_pop(gen_img, opt_img):
-            pca_result = self.pca.fit_transform(all_genotypes)
-            pca_population = pca_result[:-2]
-            pca_opt_genotype = pca_result[-2]
-            pca_old_genotype = pca_result[-1]
-
-            mean_x = pca_population[:, 0].mean()
-            mean_y = pca_population[:, 1].mean()
-
-            pca_population[:, 0] -= mean_x
-            pca_population[:, 1] -= mean_y
-            pca_opt_genotype[0] -= mean_x
-            pca_opt_genotype[1] -= mean_y
-            pca_old_genotype[0] -= mean_x 
-            pca_old_genotype[1] -= mean_y
-
-            old_optimum_x, old_optimum_y = pca_old_genotype[0] * 100 + self.window_width / 4, pca_old_genotype[1] * 100 + self.window_height / 4
-
-            optimum_x, optimum_y = pca_opt_genotype[0] * 100 + self.window_width / 4, pca_opt_genotype[1] * 100 + self.window_height / 4
-            sigma_rect = opt_img.get_rect(center=(optimum_x, optimum_y))
-
-            for i in range(1, self.max_num_children):
-                print(self.fitness_coefficient)
-                i_children_radius = -2 * (self.fitness_coefficient ** 2) * math.log(i / (self.max_num_children + 1)) * 100
-                print(i_children_radius)
-                pygame.draw.circle(self.screen, (139, 0, 0), (int(optimum_x), int(optimum_y)), int(i_children_radius), 1)
-
-            for pca_genotype in pca_population:
-                koala_rect = gen_img.get_rect(center=(pca_genotype[0] * 100 + self.window_width / 4, pca_genotype[1] * 100 + self.window_height /4))
-                self.screen.blit(gen_img, koala_rect)
-
-            self.screen.blit(opt_img, sigma_rect)
-
-            if nr % meteor_impact_every == 0:
-                scale = 100 / meteor_impact_at[1]
-                size = int(how_big * scale) 
-                scaled_meteor = pygame.transform.scale(self.meteor_image, (size, size))  
-                meteor_rect = scaled_meteor.get_rect(center=(old_optimum_x, old_optimum_y))
-                self.screen.blit(scaled_meteor, meteor_rect)
-                self.explosion.play()
-
-            most_fitted = sorted(population, key=lambda spec: spec.fit, reverse=True)[0]
-            best_genotype = most_fitted.genotype
-            euclidean_diff = distance.euclidean(opt_genotype, best_genotype)
-            self.euclidean_distances.append(euclidean_diff)
-
-           
-
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                quit()
-
-        genotypes = [spec.genotype for spec in population]
-        all_genotypes = genotypes + [opt_genotype] + [old_genotype]
-
-        self.screen.blit(self.background_image, (0, 0))
-
-        if not is_dead:
-            depict_pop(self.koala_img, self.sigma_koala)
-        else:
-            depict_pop(self.dead_koala, self.sigma_koala)
-
-        bar_width = self.window_width / (2 * num_steps) 
-
-        self.screen.blit(pygame.transform.scale(self.koala_charts, (600, 600)), (600, 0))
-        for i, diff in enumerate(self.euclidean_distances):
-            bar_height = (diff / max(self.euclidean_distances)) * (self.window_height / 2.5)
-            bar_x = self.window_width / 2 + i * bar_width
-            bar_y = self.window_height / 2 - bar_height  
-            if nr % 20 == 0:
-                bar_color = (255, 0, 0)
-            else:
-                bar_color = (0, 0, 0)
-            pygame.draw.rect(self.screen, bar_color, (bar_x, bar_y, bar_width, bar_height))
-
-
-        std_devs = [round(np.std([ind.genotype[i] for ind in population]), 3) for i in range(num_genes)]
-    
-        if is_dead:
-            population_label = "Liczba osobników:"
-            population_value = "0"
+    def build_layers(self):
+        # Warstwy, które nie zmieniają się między klatkami, renderowane raz
+        self.ring_radii = [
+            int(-2 * (self.fitness_coefficient ** 2) * math.log(i / (self.max_num_children + 1)) * 100)
+            for i in range(1, self.max_num_children)
+        ]
+        reach = max(self.ring_radii, default=0) + 1
+        self.rings = pygame.Surface((2 * reach, 2 * reach))
+        self.rings.fill((255, 0, 255))
+        self.rings.set_colorkey((255, 0, 255))
+        for radius in self.ring_radii:
+            pygame.draw.circle(self.rings, (139, 0, 0), (reach, reach), radius, 1)
+
+        self.charts_layer = pygame.transform.scale(self.koala_charts, (600, 600)).convert()
+        table_x, table_y, line_spacing = self.table_position()
+        for row, label in enumerate(["Liczba osobników:", "Zmienność genetyczna:", "Generacja:"]):
+            self.charts_layer.blit(self.font.render(label, True, (0, 0, 0)), (table_x - 600, table_y + row * line_spacing))
+        text = self.font.render('Odległość od optimum najbardziej przystosowanego osobnika', True, (0, 0, 0))
+        self.charts_layer.blit(text, text.get_rect(center=(self.window_width * 3 / 4 - 600, 20)))
+
+        # Słupki wykresu dorysowywane po jednym; czerwona kopia na co 20. pokolenie
+        self.bar_width = self.window_width / (2 * self.config.num_steps)
+        self.bars = {}
+        for color in [(0, 0, 0), (255, 0, 0)]:
+            surface = pygame.Surface((self.window_width // 2, self.window_height // 2))
+            surface.fill((255, 0, 255))
+            surface.set_colorkey((255, 0, 255))
+            self.bars[color] = surface
+        self.bars_max = 0.0
+        self.meteors = {}
+
+    def table_position(self):
+        return self.window_width * 3 / 4 - 150, self.window_height - 250, 30
+
+    def project(self, genotypes, center):
+        # Rzut na płaszczyznę: dla dwóch genów wprost, dla większej liczby PCA liczona co pca_refit_every klatek na próbce
+        if genotypes.shape[1] == 2:
+            return genotypes - center
+        if self.components is None or self.components_age >= self.pca_refit_every:
+            sample = genotypes[::max(1, len(genotypes) // self.pca_sample)]
+            centered = sample - sample.mean(axis=0)
+            _, vectors = np.linalg.eigh(centered.T @ centered)
+            components = vectors[:, ::-1][:, :2]
+            if self.components is not None:
+                components = components * np.where(np.sum(components * self.components, axis=0) < 0, -1, 1)
+            self.components, self.components_age = components, 0
+        self.components_age += 1
+        return (genotypes - center) @ self.components
+
+    def update_plot(self, population, opt_genotype, old_genotype, nr, is_dead, how_big, stats=None):
+        if self.profiler is not None:
+            self.profiler.start(nr)
+
+        if not self.offscreen:
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    pygame.quit()
+                    quit()
+            self.mark("render_events")
+
+        # population: lista osobników, Population albo sama tablica genotypów (wtedy stats są wymagane, bo tablica nie ma dostosowań)
+        if isinstance(population, np.ndarray):
+            if stats is None:
+                raise ValueError("update_plot z tablicą genotypów wymaga stats (GenerationStats pokolenia)")
+            genotypes = population
+        elif hasattr(population, "genotypes"):
+            genotypes = population.genotypes
+            fit = population.fit
         else:
-            population_label = "Liczba osobników:"
-            population_value = str(len(population))
-
-        genetic_variability_label = "Zmienność genetyczna:"
-        genetic_variability_value = str(std_devs)
-
-        generations_label = "Generacja:"
-        generations_value = str(nr)
-
-        population_label_rendered = self.font.render(population_label, True, (0, 0, 0))
-        population_value_rendered = self.font.render(population_value, True, (0, 0, 0))
-
-        genetic_variability_label_rendered = self.font.render(genetic_variability_label, True, (0, 0, 0))
-        genetic_variability_value_rendered = self.font.render(genetic_variability_value, True, (0, 0, 0))
+            genotypes = np.array([spec.genotype for spec in population]).reshape(-1, self.config.num_genes)
+            fit = np.array([spec.fit for spec in population])
+        if stats is None:
+            stats = GenerationStats(genotypes, fit)
 
-        generations_label_rendered = self.font.render(generations_label, True, (0, 0, 0))
-        generations_value_rendered = self.font.render(generations_value, True, (0, 0, 0))
-
-        table_start_x = self.window_width * 3 / 4 - 150
-        table_start_y = self.window_height - 250
-        line_spacing = 30
-
-        self.screen.blit(population_label_rendered, (table_start_x, table_start_y))
-        self.screen.blit(population_value_rendered, (table_start_x + 200, table_start_y))
-
-        self.screen.blit(genetic_variability_label_rendered, (table_start_x, table_start_y + line_spacing))
-        self.screen.blit(genetic_variability_value_rendered, (table_start_x + 200, table_start_y + line_spacing))
+        self.screen.blit(self.background_image, (0, 0))
 
-        self.screen.blit(generations_label_rendered, (table_start_x, table_start_y + 2 * line_spacing))
-        self.screen.blit(generations_value_rendered, (table_start_x + 200, table_start_y + 2 * line_spacing))
-                    
-                
-        text = self.font.render('Odległość od optimum najbardziej przystosowanego osobnika', True, (0, 0, 0))
-        text_rect = text.get_rect(center=(self.window_width * 3 / 4, 20))
-        self.screen.blit(text, text_rect)
-        print(f"{nr}, lalala")
+        gen_img = self.dead_koala if is_dead else self.koala_img
+        center = genotypes.mean(axis=0) if len(genotypes) else np.asarray(opt_genotype)
+        points = self.project(np.vstack([genotypes, [opt_genotype], [old_genotype]]), center) * 100
+        points += (self.window_width / 4, self.window_height / 4)
+        (optimum_x, optimum_y), (old_optimum_x, old_optimum_y) = points[-2], points[-1]
+
+        self.screen.blit(self.rings, self.rings.get_rect(center=(int(optimum_x), int(optimum_y))))
+
+        # Osobniki na tym samym polu thin_cell×thin_cell px i poza widoczną częścią planszy nie są rysowane
+        width, height = gen_img.get_size()
+        corners = np.floor(points[:-2] - (width / 2, height / 2)).astype(np.int64)
+        visible = (corners[:, 0] > -width) & (corners[:, 0] < self.window_width / 2) & (corners[:, 1] > -height) & (corners[:, 1] < self.window_height)
+        corners = corners[visible]
+        if len(corners):
+            corners = np.unique(corners // self.thin_cell, axis=0) * self.thin_cell
+        self.screen.blits([(gen_img, corner) for corner in corners.tolist()], False)
+
+        self.screen.blit(self.sigma_koala, self.sigma_koala.get_rect(center=(optimum_x, optimum_y)))
+
+        if how_big:
+            size = int(how_big * 100 / self.config.meteor_impact_at[1])
+            if size not in self.meteors:
+                self.meteors[size] = pygame.transform.scale(self.meteor_image, (size, size))
+            self.screen.blit(self.meteors[size], self.meteors[size].get_rect(center=(old_optimum_x, old_optimum_y)))
+            if self.explosion is not None:
+                self.explosion.play()
 
+        self.euclidean_distances.append(math.dist(opt_genotype, stats.best_genotype))
+        self.distance_generations.append(nr)
+        self.mark("render_population")
+
+        self.screen.blit(self.charts_layer, (600, 0))
+        drawn = len(self.euclidean_distances) - 1
+        if self.euclidean_distances[-1] > self.bars_max:
+            # Nowe maksimum zmienia skalę, więc trzeba przerysować wszystkie słupki
+            self.bars_max, drawn = self.euclidean_distances[-1], 0
+            for surface in self.bars.values():
+                surface.fill((255, 0, 255))
+        for color, surface in self.bars.items() if self.bars_max > 0 else []:
+            for i in range(drawn, len(self.euclidean_distances)):
+                bar_height = (self.euclidean_distances[i] / self.bars_max) * (self.window_height / 2.5)
+                pygame.draw.rect(surface, color, ((self.distance_generations[i] - 1) * self.bar_width, self.window_height / 2 - bar_height, self.bar_width, bar_height))
+        self.screen.blit(self.bars[(255, 0, 0) if how_big else (0, 0, 0)], (self.window_width / 2, 0))
+        self.mark("render_chart")
+
+        std_devs = [round(float(s), 3) for s in stats.std]
+        population_value = "0" if is_dead else str(len(population))
+        table_x, table_y, line_spacing = self.table_position()
+        for row, value in enumerate([population_value, str(std_devs), str(nr)]):
+            self.screen.blit(self.font.render(value, True, (0, 0, 0)), (table_x + 200, table_y + row * line_spacing))
+        self.mark("render_table")
+
+        if self.offscreen:
+            return
         pygame.display.flip()
         self.clock.tick(60) 
+        self.mark("render_display")
         if is_dead:
             pygame.time.wait(4000)
         else:
             pygame.time.wait(400)
+        self.mark("render_wait")
             
             
-    def the_end(self, population, ancestral_population, nr, env_gen, env_pop_num, env_avg_gen, env_avg_fitted_gen, env_std):
+    def the_end(self, population, ancestral_population, nr, env_gen, env_pop_num, env_avg_gen, env_avg_fitted_gen, env_std, genealogy, meteors=()):
         end_screen = pygame.display.set_mode((1024, 1024), pygame.DOUBLEBUF)
         phy = False
         population = sorted(population, key=lambda spec: spec.fit, reverse=True)
@@ -210,45 +232,27 @@ class PopulationVisualizer:
             text_rect = text_surface.get_rect(center=rect.center)
             end_screen.blit(text_surface, text_rect) 
 
+        def draw_meteor_lines():
+            # Pokolenia, w których spadł meteor (według trajektorii optimum)
+            for i in meteors:
+                plt.axvline(x=i, color='red', linestyle='--')
+
         def draw_evolutionary_history(generations, fitness_values, ancestral_ranking):
             fitness_values =fitness_values[::-1]
             plt.plot(generations, fitness_values)
             plt.xlabel('Generacja')
             plt.ylabel('Dostosowanie')
             plt.title('Historia ewolucyjna')
-            for i in range(20, len(generations)+1, 20):
-                plt.axvline(x=i, color='red', linestyle='--')
+            draw_meteor_lines()
 
             plt.axhline(y=1/8, color='green', linestyle='--')
             plt.text(generations[0], fitness_values[0]+0.1, f'AR:{ancestral_ranking}', color='blue')
             plt.show()
 
-        def display_genotype_history(genotype, generations=None, fitness_values=None):
-            if generations is None:
-                generations = []
-                fitness_values = []
-
-            generations.append(len(generations) + 1)
-            fitness_values.append(genotype.fit)
-
-            if genotype.parent is not None:
-                display_genotype_history(genotype.parent, generations, fitness_values)
-            else:
-                ancestral_ranking = genotype.rank if hasattr(genotype, 'rank') else "N/A"
-                draw_evolutionary_history(generations, fitness_values, ancestral_ranking)
-
-        def add_nodes_edges(genotype, G=None):
-            if G is None:
-                G = nx.DiGraph()
-                G.add_node(f"{genotype.generation}.{genotype.rank}", fit=genotype.fit)
-            
-            if genotype.kids:
-                for kid in genotype.kids:
-                    if kid.generation != 0 or kid.rank != 0:
-                        G.add_node(f"{kid.generation}.{kid.rank}", fit=kid.fit)
-                        G.add_edge(f"{genotype.generation}.{genotype.rank}", f"{kid.generation}.{kid.rank}")
-                        add_nodes_edges(kid, G=G)
-            return G
+        def display_genotype_history(genotype):
+            fitness_values, ancestral_ranking = genealogy.history(genotype.generation, genotype.parent, genotype.fit, genotype.rank)
+            generations = list(range(1, len(fitness_values) + 1))
+            draw_evolutionary_history(generations, fitness_values, ancestral_ranking)
 
         
         def draw_population_size_chart(generations, population_sizes):
@@ -256,19 +260,17 @@ class PopulationVisualizer:
             plt.xlabel('Pokolenie')
             plt.ylabel('Liczba osobników')
             plt.title('Liczebność populacji w czasie')
-            for i in range(20, len(generations)+1, 20):
-                plt.axvline(x=i, color='red', linestyle='--')
+            draw_meteor_lines()
 
             plt.show()
 
         def draw_genotypes(generations, env_avg_gen, env_fitted_gen):
-            for i in range(num_genes):
+            for i in range(self.config.num_genes):
                 plt.plot(generations, [gen[i] for gen in env_avg_gen], label=f'GP {i+1}')
-            for i in range(num_genes):
+            for i in range(self.config.num_genes):
                 plt.plot(generations, [gen[i] for gen in env_fitted_gen], label=f'GF {i+1}')
 
-            for i in range(20, len(generations)+1, 20):
-                plt.axvline(x=i, color='red', linestyle='--')
+            draw_meteor_lines()
             
             plt.legend(loc="upper right")  
             plt.xlabel('Pokolenie')
@@ -281,8 +283,7 @@ class PopulationVisualizer:
         def depict_diversity(generations, diversity):
             plt.plot(generations, diversity)
             plt.xlabel('Pokolenie')
-            for i in range(20, len(generations)+1, 20):
-                plt.axvline(x=i, color='red', linestyle='--')
+            draw_meteor_lines()
 
             plt.ylabel('Zmienność populacji')
             plt.title('Zmienność w czasie')
@@ -337,10 +338,12 @@ class PopulationVisualizer:
                                 display_genotype_history(genotype)
 
                             if button_ancestral.collidepoint(event.pos):
-                                index = int(text_ancestral) - 1
-                                ancestral_genotype = ancestral_population[index]
-                                G = add_nodes_edges(ancestral_genotype)
-                                nx.write_graphml(G, f"graph_{text_ancestral}.graphml")             
+                                # "*" zapisuje drzewa wszystkich założycieli do jednego pliku
+                                if text_ancestral.strip() == "*":
+                                    export_phylogeny(genealogy, "graph_all.graphml")
+                                else:
+                                    ancestral_genotype = ancestral_population[int(text_ancestral) - 1]
+                                    export_phylogeny(genealogy, f"graph_{text_ancestral}.graphml", [ancestral_genotype.rank])
                             
                             elif return_button_phy.collidepoint(event.pos):
                                 phy = False
@@ -0,0 +1,66 @@
+import time
+import sys
+import tracemalloc
+
+
+class StepProfiler:
+    # Czas i pamięć każdej fazy kroku; fazę kończy wywołanie mark(nazwa). Przyrost bloków to zmiana liczby żywych
+    # bloków (netto, np. wycieki); z trace_memory także szczyt pamięci w trakcie fazy ponad jej początek,
+    # łącznie z tablicami tymczasowymi zwolnionymi przed końcem fazy
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.hooks = []
+        self.totals = {}
+        self.generation = None
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.reset()
+
+    def add_hook(self, hook):
+        # hook(generation, phase, seconds, retained_blocks, peak_bytes)
+        self.hooks.append(hook)
+
+    def reset(self):
+        self.last_time = time.perf_counter()
+        self.last_blocks = sys.getallocatedblocks()
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            self.last_bytes = tracemalloc.get_traced_memory()[0]
+
+    def start(self, generation):
+        self.generation = generation
+        self.reset()
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        seconds, retained_blocks = now - self.last_time, sys.getallocatedblocks() - self.last_blocks
+        peak_bytes = tracemalloc.get_traced_memory()[1] - self.last_bytes if self.trace_memory else 0
+
+        total = self.totals.setdefault(phase, {"calls": 0, "seconds": 0.0, "max_seconds": 0.0, "retained_blocks": 0, "peak_bytes": 0})
+        total["calls"] += 1
+        total["seconds"] += seconds
+        total["max_seconds"] = max(total["max_seconds"], seconds)
+        total["retained_blocks"] += retained_blocks
+        total["peak_bytes"] = max(total["peak_bytes"], peak_bytes)
+        for hook in self.hooks:
+            hook(self.generation, phase, seconds, retained_blocks, peak_bytes)
+
+        self.reset()
+
+    def summary(self):
+        overall = sum(total["seconds"] for total in self.totals.values()) or 1.0
+        return {
+            phase: {**total, "mean_seconds": total["seconds"] / total["calls"], "share": total["seconds"] / overall}
+            for phase, total in self.totals.items()
+        }
+
+    def report(self):
+        header = f"{'faza':<17}{'wywołania':>10}{'suma [s]':>12}{'średnio [ms]':>14}{'max [ms]':>12}{'udział':>9}{'przyrost bloków':>17}"
+        lines = [header + (f"{'szczyt [MiB]':>14}" if self.trace_memory else "")]
+        for phase, total in sorted(self.summary().items(), key=lambda item: -item[1]["seconds"]):
+            lines.append(
+                f"{phase:<17}{total['calls']:>10}{total['seconds']:>12.3f}{total['mean_seconds']*1000:>14.3f}"
+                f"{total['max_seconds']*1000:>12.3f}{total['share']:>9.1%}{total['retained_blocks']:>17}"
+                + (f"{total['peak_bytes'] / 2**20:>14.2f}" if self.trace_memory else "")
+            )
+        return "\n".join(lines)
@@ -0,0 +1,97 @@
+from concurrent.futures import ProcessPoolExecutor
+from files.environment_file import Environment
+from files.config_file import SimulationConfig
+from files.batch_file import load_configs
+import subprocess
+import argparse
+import shutil
+import os
+import numpy as np
+import pygame
+
+
+class VideoWriter:
+    # Surowe klatki RGB przekazywane do ffmpeg przez potok
+    def __init__(self, path, size, fps=10):
+        if shutil.which("ffmpeg") is None:
+            raise ValueError("Do zapisu filmu potrzebny jest program ffmpeg; bez niego można zapisać ciąg obrazów")
+        width, height = size
+        self.process = subprocess.Popen(
+            ["ffmpeg", "-y", "-loglevel", "error", "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{width}x{height}",
+             "-r", str(fps), "-i", "-", "-pix_fmt", "yuv420p", path],
+            stdin=subprocess.PIPE,
+        )
+
+    def write(self, surface):
+        self.process.stdin.write(pygame.image.tobytes(surface, "RGB"))
+
+    def close(self):
+        self.process.stdin.close()
+        if self.process.wait() != 0:
+            raise ValueError("ffmpeg zakończył się błędem")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def render_run(config, out, seed=None, vectorized=True, video=False, fps=10, image_format="png"):
+    # Jeden przebieg: klatka każdego pokolenia do katalogu out (image_format: png, jpg, bmp) albo do pliku filmu out
+    from files.population_visualiser import PopulationVisualizer
+
+    env = Environment(config, vectorized, seed=seed)
+    vis = PopulationVisualizer(config, offscreen=True)
+    writer = VideoWriter(out, vis.screen.get_size(), fps) if video else None
+    if writer is None:
+        os.makedirs(out, exist_ok=True)
+
+    extinction = None
+    try:
+        for j in range(1, config.num_steps + 1):
+            is_dead = env.step(j)
+            vis.update_plot(env.population, env.opt_genotype, env.old_genotype, j, is_dead, env.how_big, env.stats)
+            if writer is not None:
+                writer.write(vis.screen)
+            else:
+                pygame.image.save(vis.screen, os.path.join(out, f"klatka_{j:05d}.{image_format}"))
+            if is_dead:
+                extinction = j
+                break
+    finally:
+        if writer is not None:
+            writer.close()
+        pygame.quit()
+
+    # seed to ziarno główne wspólne dla całej serii; przebieg odtwarza dopiero para (seed, spawn_key)
+    return {"out": out, "seed": env.seed, "spawn_key": list(env.seed_sequence.spawn_key), "frames": env.gen[-1], "extinction_gen": extinction}
+
+
+def render_batch(configs, out_dir, processes=None, seed=None, vectorized=True, video=False, fps=10, image_format="png"):
+    # Każdy przebieg w osobnym procesie (pygame nie jest bezpieczny wątkowo)
+    entropy = np.random.SeedSequence(seed).entropy
+    outs = [os.path.join(out_dir, f"przebieg_{i:03d}" + (".mp4" if video else "")) for i in range(len(configs))]
+    seeds = [np.random.SeedSequence(entropy, spawn_key=(i,)) for i in range(len(configs))]
+    os.makedirs(out_dir, exist_ok=True)
+    n = len(configs)
+    with ProcessPoolExecutor(processes) as pool:
+        return list(pool.map(render_run, configs, outs, seeds, [vectorized] * n, [video] * n, [fps] * n, [image_format] * n))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("sweep", nargs="?", default=None, help="plik JSON z zestawami parametrów (jak w batch_file); bez niego jeden przebieg")
+    parser.add_argument("--params", default="files/fisher_model_params.json", help="plik z parametrami modelu")
+    parser.add_argument("--out", default="klatki", help="katalog na wyniki")
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=None, help="ziarno główne")
+    parser.add_argument("--video", action="store_true", help="film MP4 (ffmpeg) zamiast ciągu obrazów PNG")
+    parser.add_argument("--fps", type=int, default=10)
+    parser.add_argument("--format", default="png", choices=["png", "jpg", "bmp"], help="format klatek (jpg i bmp zapisują się wielokrotnie szybciej niż png)")
+    args = parser.parse_args()
+
+    base = SimulationConfig.load(args.params)
+    configs = load_configs(args.sweep, base) if args.sweep is not None else [base]
+    for row in render_batch(configs, args.out, args.processes, args.seed, video=args.video, fps=args.fps, image_format=args.format):
+        print(f"{row['out']}: {row['frames']} klatek, ziarno {row['seed']}, spawn_key {row['spawn_key']}")
@@ -0,0 +1,172 @@
+from concurrent.futures import ProcessPoolExecutor
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from files.metrics_file import read_metrics
+import argparse
+import os
+import numpy as np
+
+DOWNSAMPLING = ("lttb", "minmax", "none")
+
+
+def lttb(x, y, threshold):
+    # Largest-Triangle-Three-Buckets: z każdego kubełka punkt tworzący największy trójkąt z sąsiadami
+    size = len(x)
+    if threshold >= size or threshold < 3:
+        return np.arange(size)
+    edges = np.linspace(1, size - 1, threshold - 1).astype(np.int64)
+    chosen = np.zeros(threshold, dtype=np.int64)
+    a = 0
+    for k in range(threshold - 2):
+        start, stop = edges[k], edges[k + 1]
+        after = slice(stop, edges[k + 2] if k + 2 < len(edges) else size)
+        avg_x, avg_y = x[after].mean(), y[after].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:stop] - y[a]) - (x[a] - x[start:stop]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        chosen[k + 1] = a
+    chosen[-1] = size - 1
+    return chosen
+
+
+def minmax(y, bins):
+    # Najmniejsza i największa wartość z każdego kubełka, w kolejności występowania
+    size = len(y)
+    if 2 * bins >= size:
+        return np.arange(size)
+    edges = np.linspace(0, size, bins + 1).astype(np.int64)
+    chosen = [np.array([0, size - 1])]
+    for start, stop in zip(edges[:-1], edges[1:]):
+        chosen.append(start + np.array([np.argmin(y[start:stop]), np.argmax(y[start:stop])]))
+    return np.unique(np.concatenate(chosen))
+
+
+def downsample(x, y, width, method="lttb"):
+    x, y = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+    if method == "none" or len(x) <= width:
+        return x, y
+    if method not in DOWNSAMPLING:
+        raise ValueError(f"Nieznana metoda zmniejszania serii: {method} (dostępne: {', '.join(DOWNSAMPLING)})")
+    index = lttb(x, y, width) if method == "lttb" else minmax(y, width // 2)
+    return x[index], y[index]
+
+
+def env_history(env):
+    # Serie z obiektu Environment (tak jak w oknie końcowym) i historia najlepiej przystosowanego osobnika
+    best = max(env.population, key=lambda spec: spec.fit, default=None)
+    return {
+        "gen": np.array(env.gen), "pop_num": np.array(env.pop_num), "stat_gen": np.array(env.gen[len(env.gen) - len(env.std_dev_sum):]),
+        "std_dev_sum": np.array(env.std_dev_sum), "avg_genotypes": np.array(env.avg_genotypes),
+        "most_fitted_genotype": np.array(env.most_fitted_genotype),
+        "lineage": env.genealogy.history(best.generation, best.parent, best.fit, best.rank) if best is not None else None,
+        "meteors": env.trajectory.meteor_generations(env.gen[-1]),
+    }
+
+
+def metrics_history(path):
+    data = read_metrics(path)
+    genes = sum(column.startswith("avg_gene_") for column in data)
+    return {
+        "gen": data["gen"], "pop_num": data["pop_num"], "stat_gen": data["gen"], "std_dev_sum": data["std_dev_sum"],
+        "avg_genotypes": np.column_stack([data[f"avg_gene_{i+1}"] for i in range(genes)]),
+        "most_fitted_genotype": np.column_stack([data[f"best_gene_{i+1}"] for i in range(genes)]),
+        "lineage": None,
+        # Starsze pliki bez kolumny how_big: uderzenia meteorów nie są znane i nie są zaznaczane
+        "meteors": data["gen"][data["how_big"] > 0] if "how_big" in data else np.zeros(0),
+    }
+
+
+def load_history(path):
+    if path.endswith(".npz"):
+        from files.checkpoint_file import load_checkpoint
+        return env_history(load_checkpoint(path))
+    return metrics_history(path)
+
+
+def meteor_lines(ax, meteors):
+    # Pionowe linie w pokoleniach uderzeń meteorów, wszystkie jako jeden obiekt (szybko także przy tysiącach uderzeń)
+    if len(meteors):
+        ax.vlines(meteors, 0, 1, transform=ax.get_xaxis_transform(), colors='red', linestyles='--', linewidth=0.5)
+
+
+def write_report(history, out_dir, width=1200, method="lttb", image_format="png", dpi=100):
+    # Wszystkie wykresy z okna "Wykresy" i "Filogeneza" zapisane do plików, bez okien (matplotlib Agg)
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+
+    def save(fig, name):
+        path = os.path.join(out_dir, f"{name}.{image_format}")
+        FigureCanvasAgg(fig).print_figure(path, dpi=dpi)
+        paths.append(path)
+
+    def figure():
+        fig = Figure(figsize=(width / dpi, width / dpi * 0.6))
+        return fig, fig.add_subplot()
+
+    fig, ax = figure()
+    ax.plot(*downsample(history["gen"], history["pop_num"], width, method))
+    meteor_lines(ax, history["meteors"])
+    ax.set_xlabel('Pokolenie')
+    ax.set_ylabel('Liczba osobników')
+    ax.set_title('Liczebność populacji w czasie')
+    save(fig, "liczebnosc")
+
+    fig, ax = figure()
+    for name, series in (("GP", history["avg_genotypes"]), ("GF", history["most_fitted_genotype"])):
+        for i in range(series.shape[1] if series.ndim == 2 else 0):
+            ax.plot(*downsample(history["stat_gen"], series[:, i], width, method), label=f'{name} {i+1}')
+    meteor_lines(ax, history["meteors"])
+    ax.legend(loc="upper right")
+    ax.set_xlabel('Pokolenie')
+    ax.set_ylabel('Wartości poszczególnych genów')
+    ax.set_title('Ewolucja genów w czasie (osobnik najlepiej przystosowany vs populacja)')
+    save(fig, "genotypy")
+
+    fig, ax = figure()
+    ax.plot(*downsample(history["stat_gen"], history["std_dev_sum"], width, method))
+    meteor_lines(ax, history["meteors"])
+    ax.set_xlabel('Pokolenie')
+    ax.set_ylabel('Zmienność populacji')
+    ax.set_title('Zmienność w czasie')
+    save(fig, "zmiennosc")
+
+    if history["lineage"] is not None:
+        fitness_values, ancestral_ranking = history["lineage"]
+        fitness_values = np.asarray(fitness_values, dtype=np.float64)[::-1]
+        generations = np.arange(1, len(fitness_values) + 1)
+        fig, ax = figure()
+        ax.plot(*downsample(generations, fitness_values, width, method))
+        meteor_lines(ax, history["meteors"][history["meteors"] <= len(generations)])
+        ax.axhline(y=1/8, color='green', linestyle='--')
+        ax.text(generations[0], fitness_values[0]+0.1, f'AR:{ancestral_ranking}', color='blue')
+        ax.set_xlabel('Generacja')
+        ax.set_ylabel('Dostosowanie')
+        ax.set_title('Historia ewolucyjna')
+        save(fig, "historia")
+
+    return paths
+
+
+def report_path(path, out_dir, width=1200, method="lttb", image_format="png"):
+    return write_report(load_history(path), out_dir, width, method, image_format)
+
+
+def report_batch(paths, out_dir, processes=None, width=1200, method="lttb", image_format="png"):
+    # Jeden podkatalog na przebieg (nazwa pliku bez rozszerzenia), przebiegi rysowane równolegle w procesach
+    outs = [os.path.join(out_dir, os.path.splitext(os.path.basename(path))[0]) for path in paths]
+    n = len(paths)
+    with ProcessPoolExecutor(processes) as pool:
+        return list(pool.map(report_path, paths, outs, [width] * n, [method] * n, [image_format] * n))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("runs", nargs="+", help="pliki CSV ze statystykami (--metrics) lub pliki stanu .npz")
+    parser.add_argument("--out", default="raport", help="katalog na wykresy")
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--width", type=int, default=1200, help="szerokość wykresu w pikselach; dłuższe serie są zmniejszane")
+    parser.add_argument("--method", default="lttb", choices=DOWNSAMPLING, help="sposób zmniejszania długich serii")
+    parser.add_argument("--format", default="png", choices=["png", "jpg", "svg", "pdf"])
+    args = parser.parse_args()
+
+    for paths in report_batch(args.runs, args.out, args.processes, args.width, args.method, args.format):
+        print("\n".join(paths))
@@ -0,0 +1,101 @@
+import numpy as np
+
+# Osobny strumień losowy dla trajektorii optimum; klucz nie pokrywa się z kluczami (konfiguracja, powtórzenie) z batch_file
+SCENARIO_STREAM = 2**32 - 1
+
+SCENARIOS = {}
+METEOR_STRATEGIES = {}
+
+
+def scenario(*names):
+    # Scenariusz: funkcja(config, t, rng) zwracająca przesunięcie optimum w krokach t (tablica len(t)×num_genes)
+    def register(fn):
+        for name in names:
+            SCENARIOS[name] = fn
+        return fn
+    return register
+
+
+def meteor_strategy(key):
+    # Strategia meteorów: funkcja(config, t, rng) zwracająca maskę kroków, w których spada meteor
+    def register(fn):
+        METEOR_STRATEGIES[key] = fn
+        return fn
+    return register
+
+
+@scenario("global warning", "global warming")
+def warming(config, t, rng):
+    return np.ones((len(t), 1)) * np.array(config.global_warming_scale, dtype=np.float64)
+
+
+@scenario("stable")
+def stable(config, t, rng):
+    return np.zeros((len(t), config.num_genes))
+
+
+@scenario("oscillation")
+def oscillation(config, t, rng):
+    # meteor_impact_every pokoleń ocieplenia, potem tyle samo ochłodzenia
+    return np.cos(np.pi * (t - 1) / config.meteor_impact_every)[:, None] * np.array(config.global_warming_scale, dtype=np.float64)
+
+
+@meteor_strategy(0)
+def scheduled(config, t, rng):
+    return t % config.meteor_impact_every == 0
+
+
+@meteor_strategy(1)
+def poisson(config, t, rng):
+    # Średnio jeden meteor na meteor_impact_every pokoleń, w losowych chwilach
+    return rng.uniform(0, 1, len(t)) < 1 / config.meteor_impact_every
+
+
+@meteor_strategy(2)
+def no_meteors(config, t, rng):
+    return np.zeros(len(t), dtype=bool)
+
+
+def scenario_rng(seed_sequence):
+    return np.random.default_rng(np.random.SeedSequence(seed_sequence.entropy, spawn_key=(*seed_sequence.spawn_key, SCENARIO_STREAM)))
+
+
+class Trajectory:
+    # optimum[t] to optimum po kroku t (wiersz 0: przed pierwszym krokiem), how_big[t] to wielkość meteoru w kroku t (0: brak)
+    def __init__(self, optimum, how_big):
+        self.optimum = optimum
+        self.how_big = how_big
+
+    def __len__(self):
+        return len(self.optimum)
+
+    def meteor_generations(self, last=None):
+        # Pokolenia (do last włącznie), w których spadł meteor, według tej trajektorii
+        return np.flatnonzero(self.how_big[:None if last is None else last + 1])
+
+    @classmethod
+    def generate(cls, config, rng, start=None, first=1):
+        if config.scenario not in SCENARIOS:
+            raise ValueError(f"Nieznany scenariusz: {config.scenario} (dostępne: {', '.join(SCENARIOS)})")
+        if config.meteor_impact_strategy not in METEOR_STRATEGIES:
+            raise ValueError(f"Nieznana strategia meteorów: {config.meteor_impact_strategy} (dostępne: {', '.join(map(str, METEOR_STRATEGIES))})")
+
+        start = rng.uniform(0, 1, config.num_genes) if start is None else np.array(start, dtype=np.float64)
+        t = np.arange(first, config.num_steps + 1)
+        moves = np.broadcast_to(SCENARIOS[config.scenario](config, t, rng), (len(t), config.num_genes)).copy()
+        # global_warming_var: odchylenie standardowe losowej części przesunięcia w jednym kroku
+        if config.global_warming_var:
+            moves += rng.normal(0, config.global_warming_var, moves.shape)
+
+        hit = METEOR_STRATEGIES[config.meteor_impact_strategy](config, t, rng)
+        sgn = rng.choice([1, -1], len(t))
+        how_big = np.where(hit, rng.integers(config.meteor_impact_at[0], config.meteor_impact_at[1], len(t)), 0)
+        # Meteor zastępuje zwykłe przesunięcie w swoim kroku
+        moves[hit] = (sgn * how_big * 1.5)[hit, None] * np.array(config.global_warming_scale, dtype=np.float64)
+
+        return cls(np.cumsum(np.vstack([start, moves]), axis=0), np.concatenate([[0], how_big]))
+
+    def branch(self, config, generation, rng):
+        # Pierwsze generation kroków bez zmian, dalej trajektoria według (nowej) konfiguracji
+        tail = Trajectory.generate(config, rng, self.optimum[generation], generation + 1)
+        return Trajectory(np.vstack([self.optimum[:generation + 1], tail.optimum[1:]]), np.concatenate([self.how_big[:generation + 1], tail.how_big[1:]]))
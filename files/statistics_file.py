@@ -0,0 +1,28 @@
+import numpy as np
+
+
+class GenerationStats:
+    # Statystyki jednego pokolenia liczone raz i współdzielone przez Environment, wizualizator i zapis metryk
+    def __init__(self, genotypes, fit, quantiles=None, chunk_size=65536):
+        self.size = len(genotypes)
+        # Liczone w float64 niezależnie od precyzji genotypów; duże populacje po kawałkach, bez tablicy N×num_genes
+        if self.size <= chunk_size:
+            self.mean = genotypes.mean(axis=0, dtype=np.float64)
+            self.variance = np.square(genotypes - self.mean).mean(axis=0)
+        else:
+            chunks = range(0, self.size, chunk_size)
+            self.mean = sum(genotypes[start:start + chunk_size].sum(axis=0, dtype=np.float64) for start in chunks) / self.size
+            self.variance = sum(np.square(genotypes[start:start + chunk_size] - self.mean).sum(axis=0) for start in chunks) / self.size
+        self.std = np.sqrt(self.variance)
+        self.best_index = int(np.argmax(fit))
+        self.best_fit = float(fit[self.best_index])
+        self.best_genotype = genotypes[self.best_index].astype(np.float64)
+        self.quantiles = np.quantile(genotypes, quantiles, axis=0) if quantiles is not None else None
+
+    @property
+    def std_dev_sum(self):
+        return sum(round(s, 3) for s in self.std)
+
+    @property
+    def avg_genotype(self):
+        return self.mean.tolist()
@@ -1,30 +1,107 @@
 from files.environment_file import Environment
-from files.population_visualiser import PopulationVisualizer
-import json
+from files.config_file import SimulationConfig
+from files.checkpoint_file import save_checkpoint, load_checkpoint
+from files.metrics_file import MetricsWriter
+from files.profiling_file import StepProfiler
+from files.pipeline_file import SimulationPipeline
+import argparse
 
-with open("files/fisher_model_params.json") as f:
-    try:
-        [
-            init_population, max_population, num_genes, mutation_probability,
-            mutation_effect, fitness_coefficient, max_num_children, scenario,
-            global_warming_scale, global_warming_var, meteor_impact_strategy,
-            meteor_impact_every, meteor_impact_at, num_steps
-        ] = json.load(f).values()
+GENEALOGY_MODES = ("full", "prune", "off")
 
-    except Exception as e:
-        print(e)
+def start_sim(config=None, vectorized=False, seed=None, profiler=None, pipelined=False):
+    from files.population_visualiser import PopulationVisualizer
 
-def start_sim():
-    env = Environment()
-    pop_vis = PopulationVisualizer()
+    config = config if config is not None else SimulationConfig.load()
+    env = Environment(config, vectorized, seed=seed, profiler=profiler)
+    if pipelined:
+        # Rysowanie działa w innym wątku niż symulacja, więc ma własny profiler
+        render_profiler = StepProfiler(profiler.trace_memory) if profiler is not None else None
+        pop_vis = PopulationVisualizer(config, render_profiler)
+        pipeline = SimulationPipeline(env, config.num_steps).start()
+        j=1
+        for snapshot in pipeline.snapshots():
+            pop_vis.update_plot(snapshot.genotypes, snapshot.opt_genotype, snapshot.old_genotype, snapshot.generation, snapshot.is_dead, snapshot.how_big, snapshot.stats)
+            j = snapshot.generation+1
+        pipeline.join()
+        if profiler is not None:
+            print(profiler.report())
+            print(render_profiler.report())
+        print(f"Pominięte klatki: {pipeline.dropped}")
+        pop_vis.the_end(env.population, env.ancestral_population,j, env.gen, env.pop_num, env.avg_genotypes, env.most_fitted_genotype, env.std_dev_sum, env.genealogy, env.trajectory.meteor_generations(env.gen[-1]))
+        return
+    pop_vis = PopulationVisualizer(config, profiler)
     is_dead = False
     j=1
-    while not is_dead and j<=num_steps:
+    while not is_dead and j<=config.num_steps:
         is_dead = env.step(j)
-        pop_vis.update_plot(env.population, env.opt_genotype, env.old_genotype, j, is_dead, env.how_big)
+        pop_vis.update_plot(env.population, env.opt_genotype, env.old_genotype, j, is_dead, env.how_big, env.stats)
         j+=1
     else:
-       pop_vis.the_end(env.population, env.ancestral_population,j, env.gen, env.pop_num, env.avg_genotypes, env.most_fitted_genotype, env.std_dev_sum)
- 
-start_sim()
- 
\ No newline at end of file
+       if profiler is not None:
+           print(profiler.report())
+       pop_vis.the_end(env.population, env.ancestral_population,j, env.gen, env.pop_num, env.avg_genotypes, env.most_fitted_genotype, env.std_dev_sum, env.genealogy, env.trajectory.meteor_generations(env.gen[-1]))
+
+def run_headless(config=None, vectorized=True, seed=None, checkpoint_every=None, checkpoint_path="checkpoint.npz", resume=None, metrics_path=None, workers=None, jit=False, profiler=None, precision="float64", genotype_file=None, genealogy=None):
+    # genealogy: "full", "prune" (tylko linie żyjących osobników) albo "off"; przy statystykach zapisywanych
+    # na dysk domyślnie "off", żeby pamięć nie rosła z liczbą pokoleń
+    genealogy = genealogy if genealogy is not None else ("off" if metrics_path is not None else "full")
+    if genealogy not in GENEALOGY_MODES:
+        raise ValueError(f"Nieznany tryb genealogii: {genealogy} (dostępne: {', '.join(GENEALOGY_MODES)})")
+    if resume is not None:
+        env = load_checkpoint(resume, config, workers=workers, jit=jit, genotype_file=genotype_file)
+        env.profiler = profiler
+        config = env.config
+        env.genealogy.recording = genealogy != "off"
+        env.genealogy.prune_extinct = genealogy == "prune"
+        if genealogy == "off":
+            env.genealogy.parents, env.genealogy.fits, env.genealogy.ranks = [], [], []
+    else:
+        config = config if config is not None else SimulationConfig.load()
+        env = Environment(
+            config, vectorized, genealogy == "prune", seed=seed, keep_history=metrics_path is None, workers=workers, jit=jit, profiler=profiler,
+            precision=precision, genotype_file=genotype_file, record_genealogy=genealogy != "off"
+        )
+    if metrics_path is not None:
+        env.metrics = MetricsWriter(metrics_path, config.num_genes, resume_from=env.gen[-1] if resume is not None else None)
+        env.keep_history = False
+    is_dead = False
+    j=env.gen[-1]+1
+    while not is_dead and j<=config.num_steps:
+        is_dead = env.step(j)
+        if checkpoint_every and not is_dead and j % checkpoint_every == 0:
+            save_checkpoint(env, checkpoint_path)
+        j+=1
+    if env.metrics is not None:
+        env.metrics.close()
+    return env
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--headless", action="store_true", help="symulacja bez okna i bez wizualizacji")
+    parser.add_argument("--vectorized", action="store_true", help="tablicowy silnik populacji")
+    parser.add_argument("--params", default="files/fisher_model_params.json", help="plik z parametrami modelu")
+    parser.add_argument("--seed", type=int, default=None, help="ziarno generatora liczb losowych")
+    parser.add_argument("--checkpoint-every", type=int, default=None, help="zapis stanu symulacji co K pokoleń")
+    parser.add_argument("--checkpoint", default="checkpoint.npz", help="plik ze stanem symulacji")
+    parser.add_argument("--resume", default=None, help="wznowienie symulacji z zapisanego stanu")
+    parser.add_argument("--workers", type=int, default=None, help="liczba wątków liczących jedno pokolenie (duże populacje)")
+    parser.add_argument("--jit", action="store_true", help="kompilowane jądro kroku (wymaga pakietu numba)")
+    parser.add_argument("--profile", action="store_true", help="czasy poszczególnych faz kroku i przyrost żywych bloków pamięci, raport na końcu")
+    parser.add_argument("--profile-memory", action="store_true", help="jak --profile, dodatkowo szczyt pamięci każdej fazy (tracemalloc, wolniej)")
+    parser.add_argument("--pipelined", action="store_true", help="symulacja w osobnym wątku, okno rysuje najnowsze pokolenie i pomija zaległe klatki")
+    parser.add_argument("--precision", default="float64", choices=["float64", "float32", "float16"], help="typ liczb w genotypach (tryb --headless)")
+    parser.add_argument("--genotype-file", default=None, help="genotypy w pliku na dysku zamiast w pamięci (tryb --headless)")
+    parser.add_argument("--metrics", default=None, help="plik CSV, do którego na bieżąco trafiają statystyki pokoleń")
+    parser.add_argument("--genealogy", default=None, choices=GENEALOGY_MODES, help="genealogia w trybie --headless: pełna, tylko linie żyjących osobników albo wyłączona (domyślnie wyłączona przy --metrics)")
+    args = parser.parse_args()
+    config = SimulationConfig.load(args.params)
+    profiler = StepProfiler(args.profile_memory) if args.profile or args.profile_memory else None
+
+    if args.headless:
+        env = run_headless(config if args.resume is None else None, seed=args.seed, checkpoint_every=args.checkpoint_every, checkpoint_path=args.checkpoint, resume=args.resume, metrics_path=args.metrics, workers=args.workers, jit=args.jit, profiler=profiler, precision=args.precision, genotype_file=args.genotype_file, genealogy=args.genealogy)
+        print(f"Ziarno: {env.seed}")
+        print(f"Generacja: {env.gen[-1]}, liczba osobników: {env.pop_num[-1]}, zmienność genetyczna: {env.std_dev_sum[-1]}")
+        if profiler is not None:
+            print(profiler.report())
+    else:
+        start_sim(config, args.vectorized, args.seed, profiler, args.pipelined)
@@ -0,0 +1,31 @@
+from files.config_file import SimulationConfig
+import numpy as np
+
+STEPS = 8
+
+
+def small_config(**changes):
+    return SimulationConfig.load().replace(**{"init_population": 2000, "max_population": 2000, "num_steps": 20, **changes})
+
+
+def run(env, first=1, last=STEPS, chunk_size=256):
+    # Mały rozmiar kawałka, żeby populacja 2000 osobników przechodziła przez ścieżki dzielone na kawałki
+    if env.vectorized:
+        env.population.chunk_size = chunk_size
+    for j in range(first, last + 1):
+        assert not env.step(j)
+    return env
+
+
+def genotypes(env):
+    if env.vectorized:
+        return np.array(env.population.genotypes)
+    return np.array([spec.genotype for spec in env.population])
+
+
+def assert_same_run(a, b):
+    np.testing.assert_array_equal(genotypes(a), genotypes(b))
+    assert a.pop_num == b.pop_num
+    assert a.std_dev_sum == b.std_dev_sum
+    for level_a, level_b in zip(a.genealogy.parents, b.genealogy.parents):
+        np.testing.assert_array_equal(level_a, level_b)
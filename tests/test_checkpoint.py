@@ -0,0 +1,18 @@
+from files.environment_file import Environment
+from files.checkpoint_file import save_checkpoint, load_checkpoint
+from tests.runs import STEPS, small_config, run, assert_same_run
+import pytest
+
+
+@pytest.mark.parametrize("vectorized", [False, True])
+def test_resume_matches_uninterrupted_run(tmp_path, vectorized):
+    config = small_config(init_population=200, max_population=500)
+    path = str(tmp_path / "checkpoint.npz")
+    uninterrupted = run(Environment(config, vectorized, seed=7))
+
+    first_half = run(Environment(config, vectorized, seed=7), last=STEPS // 2)
+    save_checkpoint(first_half, path)
+    resumed = run(load_checkpoint(path), first=STEPS // 2 + 1)
+
+    assert_same_run(uninterrupted, resumed)
+    assert resumed.gen == uninterrupted.gen
@@ -0,0 +1,95 @@
+from files.environment_file import Environment
+from files.config_file import SimulationConfig
+import numpy as np
+import pytest
+
+
+def small_config(**changes):
+    return SimulationConfig.load().replace(**{"init_population": 60, "max_population": 60, "num_steps": 40, **changes})
+
+
+def run(env, steps):
+    for j in range(1, steps + 1):
+        if env.step(j):
+            return j
+    return None
+
+
+def levels(env):
+    # Poziomy genealogii (indeksy rodziców) i rangi, z bieżącą populacją jako ostatnim poziomem, jeśli przeżyła
+    parents, ranks = list(env.genealogy.parents), list(env.genealogy.ranks)
+    if env.pop_num[-1] > 0:
+        survivors = env.population.parent if env.vectorized else np.array([spec.parent for spec in env.population])
+        parents.append(np.asarray(survivors))
+        ranks.append(np.arange(1, len(survivors) + 1))
+    return parents, ranks
+
+
+def lineage(parents, level, i):
+    # Linia przodków zwykłym przejściem po rodzicach: [(poziom, indeks), ...] aż do założyciela
+    path = [(level, i)]
+    while level > 0:
+        i, level = int(parents[level][i]), level - 1
+        path.append((level, i))
+    return path
+
+
+def brute_mrca(parents, level, a, b):
+    for (level_a, i), (_, j) in zip(lineage(parents, level, a), lineage(parents, level, b)):
+        if i == j:
+            return level_a, i
+    return None
+
+
+def assert_matches_brute_force(index, parents, ranks, sample):
+    level = len(parents) - 1
+    assert len(index) == len(parents)
+    offsets = np.concatenate([[0], np.cumsum([len(p) for p in parents])])
+
+    founders = [int(ranks[0][lineage(parents, level, i)[-1][1]]) for i in range(len(parents[level]))]
+    np.testing.assert_array_equal(index.founder(level), founders)
+
+    a, b = np.meshgrid(sample, sample)
+    a, b = a.ravel(), b.ravel()
+    expected_mrca, expected_times = [], np.zeros((len(sample), len(sample)), dtype=np.int64)
+    for k, (x, y) in enumerate(zip(a, b)):
+        ancestor = brute_mrca(parents, level, x, y)
+        expected_mrca.append(-1 if ancestor is None else offsets[ancestor[0]] + ancestor[1])
+        expected_times[k // len(sample), k % len(sample)] = -1 if ancestor is None else level - ancestor[0]
+    np.testing.assert_array_equal(index.mrca(level, a, b), expected_mrca)
+    np.testing.assert_array_equal(index.coalescence_times(level, sample), expected_times)
+
+    paths = [lineage(parents, level, i) for i in sample]
+    common = [step for step in zip(*paths) if len(set(step)) == 1]
+    expected = None
+    if common:
+        ancestor_level, i = common[0][0]
+        expected = (ancestor_level + 1, int(ranks[ancestor_level][i]), level - ancestor_level)
+    assert index.population_mrca(level, sample) == expected
+
+
+@pytest.mark.parametrize("vectorized", [False, True])
+@pytest.mark.parametrize("prune", [False, True])
+def test_ancestry_matches_parent_walk(vectorized, prune):
+    env = Environment(small_config(), vectorized, prune, seed=3)
+    assert run(env, 25) is None
+    parents, ranks = levels(env)
+    index = env.ancestry()
+    sample = np.arange(len(parents[-1]))
+    assert_matches_brute_force(index, parents, ranks, sample)
+    # Para osobników z różnych gałęzi i osobnik porównany sam ze sobą
+    assert index.population_mrca(len(index) - 1, [0]) == (len(index), 1, 0)
+
+
+@pytest.mark.parametrize("vectorized", [False, True])
+def test_ancestry_after_extinction(vectorized):
+    # Meteor w pokoleniu 20 odsuwa optimum tak daleko, że cała pełna populacja ginie naraz
+    env = Environment(small_config(init_population=300, max_population=300, meteor_impact_at=[200, 300]), vectorized, seed=2)
+    assert run(env, 40) == 20
+    assert len(env.genealogy.parents[-1]) == 300
+    parents, ranks = levels(env)
+    index = env.ancestry()
+    # Wymarłe pokolenie jest już ostatnim poziomem genealogii, nie ma dodatkowego poziomu ocalałych
+    assert len(index) == len(env.genealogy)
+    sample = np.random.default_rng(0).choice(len(parents[-1]), min(40, len(parents[-1])), replace=False)
+    assert_matches_brute_force(index, parents, ranks, sample)
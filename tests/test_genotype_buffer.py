@@ -0,0 +1,14 @@
+from files.environment_file import Environment
+from tests.runs import small_config, run, assert_same_run
+import numpy as np
+
+
+def test_genotype_file_matches_memory(tmp_path):
+    config = small_config()
+    on_disk = run(Environment(config, True, seed=7, genotype_file=str(tmp_path / "genotypy.bin")))
+    assert isinstance(on_disk.genotype_buffer.arrays, np.memmap)
+    # Populacja przodków też leży na dysku, a nie w pamięci
+    assert isinstance(on_disk.ancestral_population.genotypes, np.memmap)
+    in_memory = run(Environment(config, True, seed=7))
+    assert_same_run(in_memory, on_disk)
+    np.testing.assert_array_equal(in_memory.ancestral_population.genotypes, on_disk.ancestral_population.genotypes)
@@ -0,0 +1,11 @@
+from files.environment_file import Environment
+from files.kernels_file import HAVE_JIT
+from tests.runs import small_config, run, assert_same_run
+import pytest
+
+
+@pytest.mark.skipif(not HAVE_JIT, reason="numba nie jest zainstalowana")
+@pytest.mark.parametrize("workers", [None, 4])
+def test_jit_matches_numpy(workers):
+    config = small_config()
+    assert_same_run(run(Environment(config, True, seed=7)), run(Environment(config, True, seed=7, jit=True, workers=workers)))
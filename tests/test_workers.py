@@ -0,0 +1,7 @@
+from files.environment_file import Environment
+from tests.runs import small_config, run, assert_same_run
+
+
+def test_workers_match_single_thread():
+    config = small_config()
+    assert_same_run(run(Environment(config, True, seed=7)), run(Environment(config, True, seed=7, workers=4)))